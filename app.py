@@ -8,10 +8,26 @@ Cross Origin Resource Sharing (CORS)
 issues and requests.
 """
 # Import statements
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request, stream_with_context
 from flask_cors import CORS
 from os import environ
-import requests
+from time import monotonic
+from classifier import classify, classify_many, digit_sum, is_armstrong, is_perfect, is_prime  # noqa: F401
+from digits import digit_count
+import armstrong
+import budget
+import factorization
+import fun_fact_cache
+import http_cache
+import metrics
+import numbers_api
+import offload
+import parsing
+import prime_index
+import profiler
+import response_cache
+import server_timing
+import sieve
 
 # Initialize the Flask app
 app = Flask(__name__)
@@ -23,56 +39,173 @@ CORS(app)  # Enable Cross Origin Resource Sharing (CORS)
 # Disable key sorting for Flask's JSON encoder (as requested in requirements)
 app.json.sort_keys = False
 
+# Let numbers up to MAX_NUMBER_DIGITS digits be converted to text
+parsing.allow_long_numbers()
 
-def is_prime(n):
+# Check the Armstrong table against its generator for short numbers
+armstrong.verify_table(int(environ.get("ARMSTRONG_VERIFY_DIGITS", 6)))
+
+# Start the classification workers before any threads are running
+offload.start()
+
+# One pooled client for the Numbers API, shared by every request
+fun_facts = numbers_api.NumbersAPIClient()
+
+# Fun facts are served from memory or disk before going upstream
+fun_fact_store = fun_fact_cache.FunFactCache(fun_facts.get_fact,
+                                             fun_facts.get_facts)
+
+# Finished responses, dropped whenever their fun fact is stored again
+responses = response_cache.ResponseCache()
+fun_fact_store.listeners.append(responses.invalidate)
+
+# Bitset of the primes below PRIME_INDEX_LIMIT, for /api/primes
+primes = prime_index.load()
+
+# Report both caches' counters to /metrics
+metrics.register_caches(fun_fact_store, responses)
+
+
+def start_profile():
+    """
+    A function to start sampling a classify-number request.
+    """
+    if request.endpoint == "classify_number":
+        g.profile = profiler.start({"number": request.args.get("number", "")})
+
+
+def finish_profile(exc):
     """
-    A function to check if a number is prime.
+    A function to stop sampling, writing the stacks out if the
+    request was slow.
     """
-    if n < 2:
-        return False
-    for i in range(2, int(n ** 0.5) + 1):
-        if n % i == 0:
-            return False
-    return True
+    profile = g.pop("profile", None)
+    if profile is not None:
+        profile.finish()
 
 
-def is_perfect(n):
+def start_timing():
     """
-    A function to check if a number is perfect.
+    A function to collect the stage times of a request that
+    should get a Server-Timing header.
     """
-    if n < 1:
-        return False
-    divisors = [i for i in range(1, n) if n % i == 0]
-    return sum(divisors) == n
+    if server_timing.wanted(request.headers):
+        g.timing = metrics.start_request()
 
 
-def is_armstrong(n):
+def add_timing(response):
     """
-    A function to check if a number is an Armstrong number.
+    A function to send the stage times as a Server-Timing header.
     """
-    if n < 0:
-        return False
-    digits = str(n)
-    power = len(digits)
-    return sum(int(digit) ** power for digit in digits) == n
+    times = g.get("timing")
+    if times is not None:
+        server_timing.add(response.headers, times)
+    return response
+
+
+def finish_timing(exc):
+    times = g.pop("timing", None)
+    if times is not None:
+        metrics.finish_request(times)
+
+
+# Slow requests are profiled only when PROFILE_SLOW_MS is set
+if profiler.PROFILE_ENABLED:
+    app.before_request(start_profile)
+    app.teardown_request(finish_profile)
+
+# Server-Timing headers are only sent when configured
+if server_timing.SERVER_TIMING_ENABLED:
+    app.before_request(start_timing)
+    app.after_request(add_timing)
+    app.teardown_request(finish_timing)
 
+# Limits for /api/classify-numbers: distinct numbers per request,
+# and total digits across them (a rough measure of the work)
+MAX_BATCH_SIZE = int(environ.get("MAX_BATCH_SIZE", 1000))
+MAX_BATCH_DIGITS = int(environ.get("MAX_BATCH_DIGITS", 20000))
 
-# def is_float(value):
-#     """
-#     A function to check if a value is a valid float.
-#     """
-#     try:
-#         float(value)  # Try to convert to float
-#         return True
-#     except ValueError:
-#         return False
+# Streaming responses use newline-delimited JSON
+NDJSON_MIMETYPE = "application/x-ndjson"
 
+# Longest range /api/classify-range accepts
+MAX_RANGE_SIZE = int(environ.get("MAX_RANGE_SIZE", 10 ** 7))
 
-def digit_sum(n):
+# Seconds of sieving one range request may use
+RANGE_BUDGET = float(environ.get("RANGE_BUDGET", 10.0))
+
+
+class BatchError(Exception):
     """
-    A function to calculate the sum of the digits of a number.
+    Raised when a batch of numbers is invalid or over the limits.
     """
-    return sum(int(digit) for digit in str(abs(n)))
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+def parse_numbers_spec(spec):
+    """
+    A function to expand a spec such as "1,2,10..15" into
+    a list of integers, checking the batch size as it goes.
+    """
+    numbers = []
+    for part in spec.split(","):
+        part = part.strip()
+        try:
+            if ".." in part:
+                start, end = (parsing.parse_number(bound) for bound in part.split("..", 1))
+                if end < start:
+                    raise BatchError(f"empty range: {part}")
+                if len(numbers) + end - start + 1 > MAX_BATCH_SIZE:
+                    raise BatchError("too many numbers", 413)
+                numbers.extend(range(start, end + 1))
+            else:
+                numbers.append(parsing.parse_number(part))
+        except parsing.NumberTooLarge as e:
+            raise BatchError(str(e), 422)
+        except ValueError:
+            raise BatchError(f"not an integer: {part}")
+    return numbers
+
+
+def parse_batch(req):
+    """
+    A function to read the numbers of a batch request from the
+    "numbers" query parameter, or from a JSON body holding an
+    array of numbers (or an object with a "numbers" array).
+    Duplicates are dropped, keeping the first occurrence.
+    """
+    spec = req.args.get("numbers")
+    if spec:
+        numbers = parse_numbers_spec(spec)
+    else:
+        body = req.get_json(silent=True)
+        if isinstance(body, dict):
+            body = body.get("numbers")
+        if not isinstance(body, list) or not body:
+            raise BatchError("expected a JSON array of numbers")
+        if len(body) > MAX_BATCH_SIZE:
+            raise BatchError("too many numbers", 413)
+        numbers = []
+        for item in body:
+            if isinstance(item, bool) or not isinstance(item, (int, str)):
+                raise BatchError(f"not an integer: {item!r}")
+            try:
+                numbers.append(parsing.parse_number(item) if isinstance(item, str) else item)
+            except parsing.NumberTooLarge as e:
+                raise BatchError(str(e), 422)
+            except ValueError:
+                raise BatchError(f"not an integer: {item!r}")
+
+    numbers = list(dict.fromkeys(numbers))
+    if len(numbers) > MAX_BATCH_SIZE:
+        raise BatchError("too many numbers", 413)
+    if sum(digit_count(number) for number in numbers) > MAX_BATCH_DIGITS:
+        raise BatchError("too many digits in total", 413)
+    return numbers
 
 
 @app.route('/api/classify-number', methods=['GET'])
@@ -83,6 +216,9 @@ def classify_number():
     its properties, and a fun fact about the number
     from the Numbers API.
     """
+    # The fun fact lookup must finish within the deadline from here
+    deadline = monotonic() + fun_facts.deadline
+
     # Get the number parameter from the query string
     number = request.args.get('number')
 
@@ -129,45 +265,260 @@ def classify_number():
     # properties.append(parity)
 
     try:
-        number = int(number)
+        with metrics.timer("parse"):
+            number = parsing.parse_number(number)
+    except parsing.NumberTooLarge as e:
+        return jsonify({"error": True, "message": str(e)}), 422
     except ValueError:
         return jsonify({
             "number": "alphabet",
             "error": True}
         ), 400
 
-    prime = is_prime(number)
-    perfect = is_perfect(number)
-    armstrong = is_armstrong(number)
-    sum_digits = digit_sum(number)
-    parity = "odd" if number % 2 != 0 else "even"
-    # Checking for Armstrong properties and parity
-    properties = []
-    if armstrong:
-        properties.append("armstrong")
-    properties.append(parity)
+    # Serve a finished response if one is cached
+    key = str(number)
+    cached = responses.get(key)
+    metrics.note("response_cache", "miss" if cached is None else "hit")
+    if cached is not None:
+        return cached_response(cached)
+
+    # Checking the mathematical properties of the number; large
+    # numbers are classified in the worker processes, and checks
+    # that run out of budget come back as null
+    with budget.limit(), metrics.timer("classify"):
+        data = offload.classify(number)
 
     # Fetch the fun fact from the Numbers API using the math endpoint
-    api_url = f"http://numbersapi.com/{number}/math?json"
+    fun_fact_ok = True
     try:
-        response = requests.get(api_url)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        data = response.json()
-        # print(data)
-        fun_fact = data.get("text", "")
-    except Exception as e:
+        with metrics.timer("fun_fact"):
+            fun_fact = fun_fact_store.get(number, deadline)
+    except numbers_api.NumbersAPIError as e:
         fun_fact = f"Could not retrieve fun fact: {str(e)}"
+        fun_fact_ok = False
 
     # Build the JSON response
+    data["fun_fact"] = fun_fact
+    with metrics.timer("serialize"):
+        body = app.json.response(data).get_data()
+    cached = responses.store(number, body, data, fun_fact_store, fun_fact_ok)
+    return cached_response(cached)
+
+
+def cached_response(cached):
+    """
+    A function to turn a cached body into a response with its
+    caching headers, or into a 304 if the client already has it.
+    """
+    status, headers = http_cache.conditional(cached, request.headers)
+    if status == 304:
+        return app.response_class(status=304, headers=headers)
+    return app.response_class(cached.body, mimetype="application/json",
+                              headers=headers)
+
+
+def wants_ndjson():
+    """
+    A function to check if the client asked for newline-delimited
+    JSON (Accept: application/x-ndjson) rather than a JSON array.
+    """
+    best = request.accept_mimetypes.best_match(
+        ["application/json", NDJSON_MIMETYPE])
+    return best == NDJSON_MIMETYPE
+
+
+def ndjson_response(chunks):
+    """
+    A function to stream lists of results as NDJSON, one object
+    per line. Each list is written (and flushed) as soon as it
+    is ready, so the client sees the first lines straight away.
+    """
+    def generate():
+        for chunk in chunks:
+            yield "".join(app.json.dumps(data) + "\n" for data in chunk)
+
+    response = app.response_class(stream_with_context(generate()),
+                                  mimetype=NDJSON_MIMETYPE)
+    # Ask reverse proxies not to buffer the stream
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def add_fun_facts(results, deadline):
+    """
+    A function to add the fun fact to each classification.
+    """
+    numbers = [data["number"] for data in results]
+    facts, errors = fun_fact_store.get_many(numbers, deadline)
+    for data in results:
+        number = data["number"]
+        if number in facts:
+            data["fun_fact"] = facts[number]
+        else:
+            data["fun_fact"] = f"Could not retrieve fun fact: {errors[number]}"
+    return results
+
+
+@app.route('/api/classify-numbers', methods=['GET', 'POST'])
+def classify_numbers():
+    """
+    Classifies a batch of numbers in one request and returns
+    a JSON array with one classify-number result per distinct
+    number. The fun facts are fetched with the Numbers API's
+    batch syntax, several batches at once. With
+    Accept: application/x-ndjson the results are streamed
+    one upstream batch at a time instead.
+    """
+    deadline = monotonic() + fun_facts.deadline
+    try:
+        numbers = parse_batch(request)
+    except BatchError as e:
+        return jsonify({"error": True, "message": e.message}), e.status
+
+    if wants_ndjson():
+        # Streaming does not buy more time: the upstream batches share
+        # the request's compute budget and fun fact deadline
+        end = monotonic() + budget.COMPUTE_BUDGET
+
+        def chunks():
+            size = fun_fact_cache.FUN_FACT_BATCH_SIZE
+            for i in range(0, len(numbers), size):
+                chunk = numbers[i:i + size]
+                with budget.limit(max(end - monotonic(), 0)):
+                    results = classify_many(chunk)
+                yield add_fun_facts(results, deadline)
+        return ndjson_response(chunks())
+
+    with budget.limit():
+        results = classify_many(numbers)
+    results = add_fun_facts(results, deadline)
+    return jsonify(results), 200
+
+
+def range_chunks(start, end):
+    """
+    A function to classify a range one segment at a time
+    within RANGE_BUDGET seconds. If the budget runs out, the
+    last item says where to pick the range up again.
+    """
+    deadline = monotonic() + RANGE_BUDGET
+    for chunk in sieve.classify_range(start, end):
+        yield chunk
+        last = chunk[-1]["number"]
+        if last < end and monotonic() > deadline:
+            budget.count_exceeded(1)
+            yield [{"error": True, "message": "compute budget exceeded",
+                    "next": last + 1}]
+            return
+
+
+@app.route('/api/classify-range', methods=['GET'])
+def classify_range():
+    """
+    Classifies every number from start to end (inclusive)
+    and streams a JSON array of results, one sieve segment
+    at a time (or NDJSON with Accept: application/x-ndjson).
+    Range results have no fun fact.
+    """
+    try:
+        start = parsing.parse_number(request.args.get("start", ""))
+        end = parsing.parse_number(request.args.get("end", ""))
+    except ValueError:
+        return jsonify({"error": True, "message": "start and end must be integers"}), 400
+    if end < start:
+        return jsonify({"error": True, "message": "end is before start"}), 400
+    if end - start + 1 > MAX_RANGE_SIZE:
+        return jsonify({"error": True, "message": "range too long"}), 413
+    if start < -sieve.SIEVE_MAX or end > sieve.SIEVE_MAX:
+        return jsonify({"error": True, "message": "range out of bounds"}), 422
+
+    if wants_ndjson():
+        return ndjson_response(range_chunks(start, end))
+
+    def generate():
+        separator = "["
+        for chunk in range_chunks(start, end):
+            yield separator + ",".join(app.json.dumps(data) for data in chunk)
+            separator = ","
+        yield "]"
+
+    return app.response_class(stream_with_context(generate()),
+                              mimetype="application/json")
+
+
+@app.route('/api/primes', methods=['GET'])
+def prime_queries():
+    """
+    Answers prime queries from the prime index. With ?number=n
+    it returns whether n is prime, how many primes are at most
+    n, and the primes either side of n; with ?nth=k it returns
+    the k-th prime. Counts and nth primes beyond the index are
+    null; neighbouring primes beyond it are searched for within
+    the compute budget, and are null if that runs out.
+    """
+    nth = request.args.get('nth')
+    if nth is not None:
+        try:
+            nth = parsing.parse_number(nth)
+        except ValueError:
+            return jsonify({"error": True, "message": "nth must be an integer"}), 400
+        return jsonify({"nth": nth, "prime": primes.select(nth)}), 200
+
+    number = request.args.get('number')
+    if not number:
+        return jsonify({"error": True, "message": "number or nth is required"}), 400
+    try:
+        number = parsing.parse_number(number)
+    except parsing.NumberTooLarge as e:
+        return jsonify({"error": True, "message": str(e)}), 422
+    except ValueError:
+        return jsonify({"number": "alphabet", "error": True}), 400
+
+    with budget.limit():
+        if number in primes:
+            prime = primes.is_prime(number)
+        else:
+            prime = budget.run(is_prime, number)
+        previous = budget.run(prime_index.previous_prime, primes, number)
+        following = budget.run(prime_index.next_prime, primes, number)
     data = {
         "number": number,
-        "is_prime": prime,
-        "is_perfect": perfect,
-        "properties": properties,
-        "digit_sum": sum_digits,
-        "fun_fact": fun_fact
+        "is_prime": None if prime == budget.TIMEOUT else prime,
+        "prime_count": primes.count(number) if number < primes.limit else None,
+        "previous_prime": None if previous == budget.TIMEOUT else previous,
+        "next_prime": None if following == budget.TIMEOUT else following,
     }
-    return jsonify(data), 200  # Return the JSON response with status 200
+    timeouts = [name for name, value in (("is_prime", prime),
+                                         ("previous_prime", previous),
+                                         ("next_prime", following))
+                if value == budget.TIMEOUT]
+    if timeouts:
+        data["timeouts"] = timeouts
+    return jsonify(data), 200
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """
+    Returns the metrics in the Prometheus text format.
+    """
+    return app.response_class(metrics.render(),
+                              mimetype="text/plain; version=0.0.4")
+
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """
+    Returns the compute budget and the cache counters as JSON.
+    """
+    return jsonify({
+        "compute": budget.report(),
+        "factor_cache": factorization.factorize.cache_info()._asdict(),
+        "fun_facts": fun_fact_store.stats,
+        "offload": offload.report(),
+        "prime_index": primes.report(),
+        "responses": responses.report(),
+    }), 200
 
 
 # Handling error pages and wrong redirections
@@ -188,7 +539,12 @@ def page_not_found(e):
 
 """
 Running the application
+In production, run it with gunicorn (settings in gunicorn.conf.py):
+    gunicorn app:app
+Running this file starts Flask's development server instead,
+with the debugger only when FLASK_DEBUG=1.
 """
 if __name__ == "__main__":
     port = int(environ.get("PORT", 5000))  # Default to 5000 if not provided
-    app.run(host="0.0.0.0", port=port, debug=True)  # Listen on all interfaces (0.0.0.0) and use the specified port
+    debug = environ.get("FLASK_DEBUG", "0") == "1"
+    app.run(host="0.0.0.0", port=port, debug=debug)  # Listen on all interfaces (0.0.0.0) and use the specified port
@@ -0,0 +1,255 @@
+"""
+An asyncio version of the Number Classification API.
+It serves /api/classify-number with the same responses
+as the Flask app in app.py, but fun facts are fetched
+without blocking: one long-lived aiohttp session is shared
+by every request, and the property checks for large
+numbers run in a thread pool, or for the largest in the
+worker processes of offload.py, so the event loop never stalls.
+
+Run it with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+# Import statements
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+from contextvars import copy_context
+from os import environ
+from time import monotonic
+import asyncio
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from classifier import classify
+import budget
+import factorization
+import fun_fact_cache
+import http_cache
+import metrics
+import numbers_api
+import offload
+import parsing
+import response_cache
+import server_timing
+
+# Numbers below this size are classified inline on the event loop
+ASYNC_INLINE_LIMIT = int(environ.get("ASYNC_INLINE_LIMIT", 10 ** 9))
+
+# Threads that classify the larger numbers
+ASYNC_CLASSIFY_THREADS = int(environ.get("ASYNC_CLASSIFY_THREADS", 4))
+
+# Let numbers up to MAX_NUMBER_DIGITS digits be converted to text
+parsing.allow_long_numbers()
+
+classify_pool = ThreadPoolExecutor(max_workers=ASYNC_CLASSIFY_THREADS,
+                                   thread_name_prefix="classify")
+
+
+async def fetch_fun_fact(number, deadline=None):
+    """
+    A function to fetch a fun fact with the shared client,
+    which is only opened when the server starts.
+    """
+    return await app.state.fun_facts.get_fact(number, deadline)
+
+
+# Fun facts share the Flask app's cache files; misses are fetched here
+fun_fact_store = fun_fact_cache.FunFactCache(async_fetch=fetch_fun_fact)
+responses = response_cache.ResponseCache()
+fun_fact_store.listeners.append(responses.invalidate)
+
+# Report both caches' counters to /metrics
+metrics.register_caches(fun_fact_store, responses)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """
+    Opens the shared Numbers API client for the life of the server.
+    """
+    offload.start()
+    app.state.fun_facts = numbers_api.AsyncNumbersAPIClient()
+    yield
+    await app.state.fun_facts.close()
+    classify_pool.shutdown(wait=False)
+
+
+# Initialize the FastAPI app
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+
+def classify_within_budget(number):
+    """
+    A function to classify a number within the compute budget.
+    The budget is set here, in the thread that does the work,
+    so it starts when the classification does.
+    """
+    with budget.limit():
+        return classify(number)
+
+
+async def classify_offloaded(number):
+    """
+    A function to classify a number in the worker processes,
+    waiting no longer than the compute budget, queue included.
+    If the pool is broken it is classified in the thread pool.
+    """
+    end = monotonic() + budget.COMPUTE_BUDGET
+    try:
+        future = offload.submit(number, end)
+        return await asyncio.wait_for(asyncio.wrap_future(future),
+                                      offload.wait_timeout(end))
+    except asyncio.TimeoutError:
+        return offload.timed_out(number)
+    except BrokenProcessPool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            classify_pool, copy_context().run, classify_within_budget, number)
+
+
+def cached_response(cached, request):
+    """
+    A function to turn a cached body into a response with its
+    caching headers, or into a 304 if the client already has it.
+    """
+    status, headers = http_cache.conditional(cached, request.headers)
+    if status == 304:
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type="application/json",
+                    headers=headers)
+
+
+async def add_timing(request: Request, call_next):
+    """
+    Collects the stage times of requests that should get a
+    Server-Timing header, and sends them in it.
+    """
+    if not server_timing.wanted(request.headers):
+        return await call_next(request)
+    times = metrics.start_request()
+    try:
+        response = await call_next(request)
+        server_timing.add(response.headers, times)
+        return response
+    finally:
+        metrics.finish_request(times)
+
+
+# Server-Timing headers are only sent when configured
+if server_timing.SERVER_TIMING_ENABLED:
+    app.middleware("http")(add_timing)
+
+
+@app.get("/api/classify-number")
+async def classify_number(request: Request, number: str = None):
+    """
+    Checks the mathematical properties of a number,
+    and returns a JSON response containing the number,
+    its properties, and a fun fact about the number
+    from the Numbers API.
+    """
+    # The fun fact lookup must finish within the deadline from here
+    deadline = monotonic() + app.state.fun_facts.deadline
+
+    if not number:
+        return JSONResponse(status_code=400, content={"error": True})
+
+    try:
+        with metrics.timer("parse"):
+            number = parsing.parse_number(number)
+    except parsing.NumberTooLarge as e:
+        return JSONResponse(status_code=422, content={
+            "error": True,
+            "message": str(e)})
+    except ValueError:
+        return JSONResponse(status_code=400, content={
+            "number": "alphabet",
+            "error": True})
+
+    # Serve a finished response if one is cached
+    key = str(number)
+    cached = responses.get(key)
+    metrics.note("response_cache", "miss" if cached is None else "hit")
+    if cached is not None:
+        return cached_response(cached, request)
+
+    # Start the fun fact lookup while the properties are computed
+    fun_fact_task = asyncio.ensure_future(fun_fact_store.get_async(number, deadline))
+    with metrics.timer("classify"):
+        if offload.wants(number):
+            # Heavy numbers go to the worker processes, outside the GIL
+            data = await classify_offloaded(number)
+        elif abs(number) < ASYNC_INLINE_LIMIT:
+            data = classify_within_budget(number)
+        else:
+            loop = asyncio.get_running_loop()
+            # Run in a copy of the context, so the checks are timed
+            data = await loop.run_in_executor(
+                classify_pool, copy_context().run, classify_within_budget, number)
+
+    fun_fact_ok = True
+    try:
+        # Only the wait left after classifying is timed here
+        with metrics.timer("fun_fact"):
+            fun_fact = await fun_fact_task
+    except numbers_api.NumbersAPIError as e:
+        fun_fact = f"Could not retrieve fun fact: {str(e)}"
+        fun_fact_ok = False
+
+    data["fun_fact"] = fun_fact
+    with metrics.timer("serialize"):
+        body = JSONResponse(content=data).body
+    cached = responses.store(number, body, data, fun_fact_store, fun_fact_ok)
+    return cached_response(cached, request)
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Returns the metrics in the Prometheus text format.
+    """
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/stats")
+async def stats():
+    """
+    Returns the compute budget and the cache counters as JSON.
+    """
+    return JSONResponse(status_code=200, content={
+        "compute": budget.report(),
+        "factor_cache": factorization.factorize.cache_info()._asdict(),
+        "fun_facts": fun_fact_store.stats,
+        "offload": offload.report(),
+        "responses": responses.report(),
+    })
+
+
+# Handling error pages and wrong redirections
+@app.exception_handler(StarletteHTTPException)
+async def page_not_found(request: Request, e):
+    """
+    Returns an error message in JSON
+    when the user tries to access
+    a invalid or undefined route.
+    """
+    return JSONResponse(status_code=e.status_code, content={
+        "number": "alphabet",
+        "error": True})
+
+
+"""
+Running the application
+"""
+if __name__ == "__main__":
+    import uvicorn
+    port = int(environ.get("PORT", 5000))  # Default to 5000 if not provided
+    uvicorn.run(app, host="0.0.0.0", port=port)
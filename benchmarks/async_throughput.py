@@ -0,0 +1,127 @@
+"""
+Compares concurrent-connection throughput of the Flask app
+(app.py, threaded development server) and the asyncio app
+(asgi_app.py, uvicorn) against a local stub of the Numbers API
+that answers after a fixed delay. Each server runs in its own
+process, and every request asks for a different number so
+that each one waits on the upstream.
+
+Usage:
+    python benchmarks/async_throughput.py [requests] [concurrency]
+"""
+import asyncio
+import os
+import signal
+import socket
+import subprocess
+import sys
+from statistics import median, quantiles
+from time import perf_counter, sleep
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import aiohttp  # noqa: E402
+from urllib.error import URLError  # noqa: E402
+from urllib.request import urlopen  # noqa: E402
+from stub_numbers_api import StubNumbersAPI  # noqa: E402
+
+# Seconds the stub takes to answer each fun fact
+UPSTREAM_DELAY = 0.05
+
+SERVERS = {
+    "flask": [sys.executable, "-c",
+              "import logging, sys; from werkzeug.serving import run_simple; "
+              "from app import app; logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+              "run_simple('127.0.0.1', int(sys.argv[1]), app, threaded=True)"],
+    "asgi": [sys.executable, "-m", "uvicorn", "asgi_app:app",
+             "--host", "127.0.0.1", "--log-level", "warning", "--port"],
+}
+
+
+def free_port():
+    """
+    A function to find a free local TCP port.
+    """
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(command, env):
+    """
+    A function to start a server process and wait until it answers.
+    """
+    port = free_port()
+    # A session of its own, so its worker processes can be stopped with it
+    process = subprocess.Popen(command + [str(port)], cwd=ROOT, env=env,
+                               start_new_session=True)
+    base_url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            urlopen(f"{base_url}/api/classify-number?number=1", timeout=5).read()
+            return process, base_url
+        except (URLError, ConnectionError):
+            sleep(0.05)
+    stop_server(process)
+    raise RuntimeError(f"server did not start: {command}")
+
+
+def stop_server(process):
+    """
+    A function to stop a server process and every process it started.
+    """
+    os.killpg(process.pid, signal.SIGTERM)
+    process.wait()
+
+
+async def load(base_url, total, concurrency, offset):
+    """
+    A function to send total requests with at most concurrency
+    in flight, returning the elapsed time and the latencies.
+    """
+    latencies = []
+    queue = iter(range(offset, offset + total))
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        async def worker():
+            for number in queue:
+                start = perf_counter()
+                async with client.get(
+                        f"{base_url}/api/classify-number?number={number}") as response:
+                    response.raise_for_status()
+                    await response.read()
+                latencies.append((perf_counter() - start) * 1000)
+
+        start = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return perf_counter() - start, latencies
+
+
+def report(name, elapsed, latencies):
+    p99 = quantiles(latencies, n=100)[98]
+    print(f"{name:<10}{len(latencies) / elapsed:>12.1f}"
+          f"{median(latencies):>12.1f}{p99:>12.1f}")
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    with StubNumbersAPI(delay=UPSTREAM_DELAY) as stub:
+        env = dict(os.environ, NUMBERS_API_URL=stub.base_url,
+                   NUMBERS_API_POOL_SIZE=str(concurrency),
+                   FUN_FACT_CACHE_PATH="")
+        print(f"{total} requests, {concurrency} concurrent, "
+              f"{UPSTREAM_DELAY * 1000:.0f} ms upstream")
+        print(f"{'server':<10}{'req/s':>12}{'median ms':>12}{'p99 ms':>12}")
+        for offset, (name, command) in enumerate(SERVERS.items()):
+            process, base_url = start_server(command, env)
+            try:
+                report(name, *asyncio.run(
+                    load(base_url, total, concurrency, (offset + 1) * total)))
+            finally:
+                stop_server(process)
+
+
+if __name__ == "__main__":
+    main()
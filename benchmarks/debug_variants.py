@@ -0,0 +1,172 @@
+"""
+Measures the classifier drafts in debug/ against the app.
+Every file in debug/ is parsed (not imported, so no server or
+network code runs) and its property functions are pulled out
+by name: check_prime/is_prime, check_perfect/is_perfect,
+check_armstrong/is_armstrong, sum_digits/digit_sum and
+validate_integer. Each one is run over a shared corpus and
+cross-checked against the app's own function for that
+property, then timed, and the throughput and latency
+percentiles are printed (and written as JSON with --output).
+
+Usage:
+    python benchmarks/debug_variants.py [--repeat N] [--output FILE]
+"""
+import argparse
+import ast
+import json
+import os
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import classifier  # noqa: E402
+import parsing  # noqa: E402
+
+DEBUG_DIR = os.path.join(ROOT, "debug")
+
+# Property each draft function name implements
+ROLES = {
+    "check_prime": "is_prime", "is_prime": "is_prime",
+    "check_perfect": "is_perfect", "is_perfect": "is_perfect",
+    "check_armstrong": "is_armstrong", "is_armstrong": "is_armstrong",
+    "sum_digits": "digit_sum", "digit_sum": "digit_sum",
+    "validate_integer": "parse",
+}
+
+
+def parse_reference(text):
+    """
+    The app's input parsing, returning None for bad input
+    as the drafts do.
+    """
+    try:
+        return parsing.parse_number(text)
+    except ValueError:
+        return None
+
+
+REFERENCE = {
+    "is_prime": classifier.is_prime,
+    "is_perfect": classifier.is_perfect,
+    "is_armstrong": classifier.is_armstrong,
+    "digit_sum": classifier.digit_sum,
+    "parse": parse_reference,
+}
+
+# Shared inputs; the largest keep the O(n) drafts within seconds
+NUMBERS = list(range(-20, 1001)) + [
+    8128, 9474, 54748, 92727, 93084, 99991, 548834, 999983, 1000000]
+TEXTS = ["12", "-7", " 42 ", "007", "abc", "1.5", "- 3", "-3", "+8", "",
+         "1e3", "0x10", "1_000", "9" * 30, "-" + "9" * 30]
+
+CORPUS = {"parse": TEXTS}
+
+
+def load_variant(path):
+    """
+    A function to compile the property functions of a draft,
+    returning a dict from property to (function name, function).
+    Only the function definitions are run, with math imported.
+    """
+    with open(path) as f:
+        tree = ast.parse(f.read(), path)
+    found = {}
+    for node in tree.body:
+        if isinstance(node, ast.FunctionDef) and node.name in ROLES:
+            node.decorator_list = []
+            found[node.name] = node
+    module = ast.Module(body=list(found.values()), type_ignores=[])
+    namespace = {"math": __import__("math")}
+    exec(compile(module, path, "exec"), namespace)
+    return {ROLES[name]: (name, namespace[name]) for name in found}
+
+
+def run(func, inputs, repeat):
+    """
+    A function to call func on every input repeat times,
+    returning the outputs of the first pass (an exception
+    counts as the output) and every call's time in microseconds.
+    """
+    outputs = []
+    times = []
+    for i in range(repeat):
+        for value in inputs:
+            start = perf_counter()
+            try:
+                result = func(value)
+            except Exception as e:
+                result = f"{type(e).__name__}"
+            times.append((perf_counter() - start) * 1e6)
+            if i == 0:
+                outputs.append(result)
+    return outputs, times
+
+
+def percentile(times, fraction):
+    """
+    A function to pick a percentile from sorted times.
+    """
+    return times[int(fraction * (len(times) - 1))]
+
+
+def measure(func, role, repeat, expected):
+    """
+    A function to cross-check and time one function.
+    """
+    inputs = CORPUS.get(role, NUMBERS)
+    outputs, times = run(func, inputs, repeat)
+    mismatches = [value for value, got, want in zip(inputs, outputs, expected)
+                  if got != want]
+    times.sort()
+    return {
+        "mismatches": len(mismatches),
+        "examples": [repr(value) for value in mismatches[:5]],
+        "calls_per_s": round(len(times) / (sum(times) / 1e6)),
+        "p50_us": round(percentile(times, 0.50), 3),
+        "p95_us": round(percentile(times, 0.95), 3),
+        "p99_us": round(percentile(times, 0.99), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the debug/ drafts.")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="passes over the corpus (default 3)")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    expected = {role: run(func, CORPUS.get(role, NUMBERS), 1)[0]
+                for role, func in REFERENCE.items()}
+    results = {role: {"app": measure(func, role, args.repeat, expected[role])}
+               for role, func in REFERENCE.items()}
+    for filename in sorted(os.listdir(DEBUG_DIR)):
+        if not filename.endswith(".py"):
+            continue
+        variant = filename[:-3]
+        for role, (name, func) in load_variant(
+                os.path.join(DEBUG_DIR, filename)).items():
+            results[role][f"{variant}:{name}"] = measure(
+                func, role, args.repeat, expected[role])
+
+    print(f"{'property':<14}{'variant':<30}{'wrong':>6}{'calls/s':>11}"
+          f"{'p50 us':>9}{'p95 us':>10}{'p99 us':>10}")
+    for role, variants in results.items():
+        ranked = sorted(variants.items(), key=lambda item: (
+            item[1]["mismatches"] > 0, -item[1]["calls_per_s"]))
+        for variant, stats in ranked:
+            print(f"{role:<14}{variant:<30}{stats['mismatches']:>6}"
+                  f"{stats['calls_per_s']:>11}{stats['p50_us']:>9.1f}"
+                  f"{stats['p95_us']:>10.1f}{stats['p99_us']:>10.1f}")
+        print()
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmarks the divisor-sum engine in divisors.py.
+For every magnitude up to 10^18 it times is_perfect
+and sigma on random numbers, semiprimes and the perfect
+numbers themselves, and prints the median and worst time.
+
+Usage:
+    python benchmarks/divisor_sum.py
+"""
+import os
+import random
+import sys
+from statistics import median
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import divisors  # noqa: E402
+import primality  # noqa: E402
+
+SAMPLES = 200
+
+
+def random_prime(digits, rng):
+    """
+    A function to pick a random prime with the given number of digits.
+    """
+    while True:
+        n = rng.randrange(10 ** (digits - 1), 10 ** digits)
+        if primality.is_prime(n):
+            return n
+
+
+def time_calls(func, numbers):
+    """
+    A function to time func on every number,
+    returning the times in milliseconds.
+    """
+    times = []
+    for n in numbers:
+        start = perf_counter()
+        func(n)
+        times.append((perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    rng = random.Random(1)
+    print(f"{'corpus':<24}{'function':<12}{'median ms':>12}{'max ms':>12}")
+    for digits in (3, 6, 9, 12, 15, 18):
+        corpora = {
+            f"random 10^{digits}": [
+                rng.randrange(10 ** (digits - 1), 10 ** digits)
+                for _ in range(SAMPLES)
+            ],
+            f"semiprime 10^{digits}": [
+                random_prime(digits // 2, rng) * random_prime(digits - digits // 2, rng)
+                for _ in range(SAMPLES // 10)
+            ] if digits >= 6 else [],
+        }
+        for name, numbers in corpora.items():
+            if not numbers:
+                continue
+            for func in (divisors.is_perfect, divisors.sigma):
+                times = time_calls(func, numbers)
+                print(f"{name:<24}{func.__name__:<12}"
+                      f"{median(times):>12.4f}{max(times):>12.4f}")
+    perfect = sorted(divisors.PERFECT_NUMBERS)
+    times = time_calls(divisors.is_perfect, perfect)
+    print(f"{'perfect numbers':<24}{'is_perfect':<12}"
+          f"{median(times):>12.4f}{max(times):>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
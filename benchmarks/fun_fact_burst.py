@@ -0,0 +1,78 @@
+"""
+A load test for request coalescing.
+A burst of concurrent lookups for a handful of numbers is sent
+through the fun fact cache (threads) and through AsyncSingleFlight
+(asyncio tasks), against a slow local stub of the Numbers API.
+It prints how many upstream calls each unique number caused,
+with and without single-flight.
+
+Usage:
+    python benchmarks/fun_fact_burst.py [callers] [unique_numbers]
+"""
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numbers_api  # noqa: E402
+from fun_fact_cache import FunFactCache  # noqa: E402
+from singleflight import AsyncSingleFlight  # noqa: E402
+from stub_numbers_api import StubNumbersAPI  # noqa: E402
+
+# Seconds the stub takes to answer, so the burst overlaps
+UPSTREAM_DELAY = 0.2
+
+
+def burst_threads(fetch, callers, unique):
+    """
+    A function to call fetch from callers threads at once.
+    """
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(fetch, [i % unique for i in range(callers)]))
+
+
+async def burst_tasks(fetch, callers, unique):
+    """
+    A function to await fetch from callers tasks at once.
+    """
+    await asyncio.gather(*(fetch(i % unique) for i in range(callers)))
+
+
+def run(name, callers, unique, drive):
+    with StubNumbersAPI(delay=UPSTREAM_DELAY) as stub:
+        client = numbers_api.NumbersAPIClient(base_url=stub.base_url,
+                                              pool_size=callers)
+        drive(client)
+        per_number = stub.requests_served / unique
+        print(f"{name:<32}{stub.requests_served:>10}{per_number:>14.2f}")
+        client.close()
+
+
+def main():
+    callers = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    unique = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    print(f"{callers} concurrent lookups of {unique} numbers")
+    print(f"{'mode':<32}{'upstream':>10}{'per number':>14}")
+
+    run("threads, no coalescing", callers, unique,
+        lambda client: burst_threads(client.get_fact, callers, unique))
+
+    def threads_cached(client):
+        cache = FunFactCache(client.get_fact, path="")
+        burst_threads(cache.get, callers, unique)
+    run("threads, fun fact cache", callers, unique, threads_cached)
+
+    def tasks_coalesced(client):
+        flight = AsyncSingleFlight()
+
+        async def fetch(number):
+            return await flight.do(
+                number, lambda: asyncio.to_thread(client.get_fact, number))
+        asyncio.run(burst_tasks(fetch, callers, unique))
+    run("asyncio, AsyncSingleFlight", callers, unique, tasks_coalesced)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Measures fun fact latency against a local stub of the Numbers API,
+once with a fresh requests.get per lookup (the old behaviour) and
+once through the pooled NumbersAPIClient.
+
+Usage:
+    python benchmarks/fun_fact_pooling.py [lookups]
+"""
+import os
+import sys
+from statistics import median, quantiles
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests  # noqa: E402
+import numbers_api  # noqa: E402
+from stub_numbers_api import StubNumbersAPI  # noqa: E402
+
+
+def measure(fetch, lookups):
+    """
+    A function to time lookups calls of fetch, in milliseconds.
+    """
+    times = []
+    for number in range(lookups):
+        start = perf_counter()
+        fetch(number)
+        times.append((perf_counter() - start) * 1000)
+    return times
+
+
+def report(name, times):
+    p99 = quantiles(times, n=100)[98]
+    print(f"{name:<12}{median(times):>12.3f}{p99:>12.3f}{sum(times):>12.1f}")
+
+
+def main():
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    with StubNumbersAPI() as stub:
+        client = numbers_api.NumbersAPIClient(base_url=stub.base_url)
+        print(f"{'mode':<12}{'median ms':>12}{'p99 ms':>12}{'total ms':>12}")
+        report("unpooled", measure(
+            lambda n: requests.get(f"{stub.base_url}/{n}/math?json").json(),
+            lookups))
+        report("pooled", measure(client.get_fact, lookups))
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
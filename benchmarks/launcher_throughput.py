@@ -0,0 +1,64 @@
+"""
+Compares the throughput of the Flask app under the old launcher
+(Flask's development server with debug=True, as app.py used to
+run it) and under gunicorn with gunicorn.conf.py, against a
+local stub of the Numbers API. Two loads are sent: distinct
+small numbers, which mostly wait on the upstream, and the mix
+from offload_scaling.py, in which one request in ten asks for a
+401-digit prime. The response and factorization caches are off,
+so every request does its work.
+
+Usage:
+    python benchmarks/launcher_throughput.py [requests] [concurrency]
+"""
+import asyncio
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from async_throughput import report, start_server, stop_server  # noqa: E402
+from offload_scaling import load, workload  # noqa: E402
+from stub_numbers_api import StubNumbersAPI  # noqa: E402
+
+# Seconds the stub takes to answer each fun fact
+UPSTREAM_DELAY = 0.05
+
+LAUNCHERS = {
+    "dev-debug": [sys.executable, "-c",
+                  "import logging, sys; from app import app; "
+                  "logging.getLogger('werkzeug').setLevel(logging.ERROR); "
+                  "app.run(host='127.0.0.1', port=int(sys.argv[1]), "
+                  "debug=True, use_reloader=False)"],
+    "gunicorn": [sys.executable, "-c",
+                 "import sys; from gunicorn.app.wsgiapp import run; "
+                 "sys.argv = ['gunicorn', 'app:app', '--log-level', 'warning', "
+                 "'--bind', '127.0.0.1:' + sys.argv[1]]; run()"],
+}
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    loads = {"upstream": list(range(total)), "mixed": workload(total)}
+    with StubNumbersAPI(delay=UPSTREAM_DELAY) as stub:
+        env = dict(os.environ, NUMBERS_API_URL=stub.base_url,
+                   NUMBERS_API_POOL_SIZE=str(concurrency),
+                   FUN_FACT_CACHE_PATH="", RESPONSE_CACHE_BYTES="0",
+                   FACTOR_CACHE_SIZE="0")
+        print(f"{total} requests, {concurrency} concurrent, "
+              f"{UPSTREAM_DELAY * 1000:.0f} ms upstream, {os.cpu_count()} CPUs")
+        for kind, numbers in loads.items():
+            print(f"\n{kind} load")
+            print(f"{'server':<10}{'req/s':>12}{'median ms':>12}{'p99 ms':>12}")
+            for name, command in LAUNCHERS.items():
+                process, base_url = start_server(command, env)
+                try:
+                    report(name, *asyncio.run(load(base_url, numbers, concurrency)))
+                finally:
+                    stop_server(process)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Measures Flask throughput on a mixed workload with the
+classification process pool (offload.py) off and with a
+growing number of worker processes. Most requests ask for
+small numbers; every HEAVY_EVERY-th asks for a 401-digit prime,
+whose Baillie-PSW test takes tens of milliseconds. The
+factorization and response caches are turned off so every
+request does the work, and the fun facts come from a local stub.
+
+Usage:
+    python benchmarks/offload_scaling.py [requests] [concurrency]
+"""
+import asyncio
+import os
+import sys
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import aiohttp  # noqa: E402
+from async_throughput import SERVERS, report, start_server, stop_server  # noqa: E402
+from primality import is_prime  # noqa: E402
+from stub_numbers_api import StubNumbersAPI  # noqa: E402
+
+# One request in this many asks for a heavy number
+HEAVY_EVERY = 10
+
+# The heavy number is the first prime above this
+HEAVY_BASE = 10 ** 400
+
+
+def next_prime(n):
+    """
+    A function to find the smallest prime above n.
+    """
+    n += 1
+    while not is_prime(n):
+        n += 1
+    return n
+
+
+def workload(total):
+    """
+    A function to build the list of numbers to request.
+    """
+    heavy = next_prime(HEAVY_BASE)
+    return [heavy if i % HEAVY_EVERY == 0 else i for i in range(total)]
+
+
+async def load(base_url, numbers, concurrency):
+    """
+    A function to request every number with at most concurrency
+    in flight, returning the elapsed time and the latencies.
+    """
+    latencies = []
+    queue = iter(numbers)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=connector) as client:
+        async def worker():
+            for number in queue:
+                start = perf_counter()
+                async with client.get(
+                        f"{base_url}/api/classify-number?number={number}") as response:
+                    response.raise_for_status()
+                    await response.read()
+                latencies.append((perf_counter() - start) * 1000)
+
+        start = perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return perf_counter() - start, latencies
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    numbers = workload(total)
+    cores = os.cpu_count() or 1
+    counts = sorted({0, 1, 2, cores} | {n for n in (4, 8) if n < cores})
+    with StubNumbersAPI() as stub:
+        print(f"{total} requests, {concurrency} concurrent, "
+              f"1 in {HEAVY_EVERY} heavy, {cores} cores")
+        print(f"{'processes':<10}{'req/s':>12}{'median ms':>12}{'p99 ms':>12}")
+        for processes in counts:
+            env = dict(os.environ, NUMBERS_API_URL=stub.base_url,
+                       FUN_FACT_CACHE_PATH="", FACTOR_CACHE_SIZE="0",
+                       RESPONSE_CACHE_BYTES="0",
+                       CLASSIFY_PROCESSES=str(processes))
+            process, base_url = start_server(SERVERS["flask"], env)
+            try:
+                report(str(processes), *asyncio.run(
+                    load(base_url, numbers, concurrency)))
+            finally:
+                stop_server(process)
+
+
+if __name__ == "__main__":
+    main()
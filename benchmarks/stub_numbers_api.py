@@ -0,0 +1,81 @@
+"""
+A local stand-in for the Numbers API, used by the benchmarks.
+It answers /<number>/math?json (and the batch form
+/<n1>,<n2>/math?json) over HTTP/1.1 keep-alive after an
+optional artificial delay, and counts the requests it serves.
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from time import sleep
+import json
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Serves fake math facts.
+    """
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests_served += 1
+            server.counts[self.path] = server.counts.get(self.path, 0) + 1
+        if server.delay:
+            sleep(server.delay)
+        spec = self.path.lstrip("/").split("/")[0]
+        numbers = spec.split(",")
+        if len(numbers) == 1:
+            body = {"text": f"{spec} is a stub fact.", "number": spec,
+                    "found": True, "type": "math"}
+        else:
+            body = {n: f"{n} is a stub fact." for n in numbers}
+        payload = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    A threading HTTP server with room for bursts of connections.
+    """
+    daemon_threads = True
+    request_queue_size = 1024
+
+
+class StubNumbersAPI:
+    """
+    Runs the stub server on a free local port in a background thread.
+    Use it as a context manager; base_url points at the server.
+    """
+
+    def __init__(self, delay=0.0):
+        self.server = StubServer(("127.0.0.1", 0), StubHandler)
+        self.server.lock = Lock()
+        self.server.delay = delay
+        self.server.requests_served = 0
+        self.server.counts = {}
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    @property
+    def requests_served(self):
+        return self.server.requests_served
+
+    @property
+    def counts(self):
+        return self.server.counts
+
+    def __enter__(self):
+        Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
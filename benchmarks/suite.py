@@ -0,0 +1,240 @@
+"""
+The benchmark suite for the property checks and the endpoint.
+Each property check (is_prime, is_perfect, is_armstrong and
+digit_sum) is timed on every number of five corpora: small
+numbers, large primes, perfect numbers, Armstrong numbers, and
+adversarial composites (Carmichael numbers, strong pseudoprimes,
+semiprimes and prime squares). The factorization cache is
+cleared before every call, so each call does the full work.
+/api/classify-number is then timed through the Flask test
+client against a local stub of the Numbers API, cold (every
+cache cleared) and hot (served from the response cache).
+
+The results are written as JSON; compare two runs to see
+which timings moved.
+
+Usage:
+    python benchmarks/suite.py [--repeat N] [--output FILE]
+    python benchmarks/suite.py compare BASE.json NEW.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+from statistics import mean, median
+from time import perf_counter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# The endpoint runs in this process, without the disk cache
+os.environ.setdefault("FUN_FACT_CACHE_PATH", "")
+os.environ.setdefault("CLASSIFY_PROCESSES", "0")
+
+import classifier  # noqa: E402
+import factorization  # noqa: E402
+import primality  # noqa: E402
+from stub_numbers_api import StubNumbersAPI  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# A timing counts as moved when it changes by more than this factor
+THRESHOLD = 1.2
+
+
+def next_prime(n):
+    """
+    A function to find the smallest prime above n.
+    """
+    n += 1
+    while not primality.is_prime(n):
+        n += 1
+    return n
+
+
+def corpora():
+    """
+    A function to build the named lists of numbers to time.
+    """
+    return {
+        "small": [0, 1, 2, 7, 12, 42, 97, 100, 1000, 65535, 99991, 999983],
+        "large_prime": [2 ** 61 - 1, 2 ** 89 - 1, 2 ** 127 - 1,
+                        next_prime(10 ** 30), next_prime(10 ** 50),
+                        next_prime(10 ** 100), 2 ** 521 - 1],
+        "perfect": [6, 28, 496, 8128, 33550336, 2 ** 30 * (2 ** 31 - 1),
+                    2 ** 60 * (2 ** 61 - 1), 2 ** 126 * (2 ** 127 - 1),
+                    2 ** 520 * (2 ** 521 - 1)],
+        "armstrong": [153, 9474, 548834, 4679307774, 35641594208964132,
+                      115132219018763992565095597973971522401],
+        "adversarial": [
+            # Carmichael numbers
+            561, 41041, 825265, 321197185,
+            # Strong pseudoprimes to the smallest prime bases
+            2047, 3215031751, 3825123056546413051,
+            318665857834031151167461,
+            # Semiprimes and a prime square
+            1000003 * 1000033, 10000019 * 10000079, (2 ** 61 - 1) ** 2,
+        ],
+    }
+
+
+def summarize(times):
+    """
+    A function to summarize times in microseconds.
+    """
+    times = sorted(times)
+    return {
+        "calls": len(times),
+        "median_us": round(median(times), 3),
+        "mean_us": round(mean(times), 3),
+        "p95_us": round(times[int(0.95 * (len(times) - 1))], 3),
+        "max_us": round(times[-1], 3),
+    }
+
+
+def time_calls(func, numbers, repeat, setup=None):
+    """
+    A function to time func on every number repeat times,
+    running setup (untimed) before every call.
+    """
+    times = []
+    for n in numbers:
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            start = perf_counter()
+            func(n)
+            times.append((perf_counter() - start) * 1e6)
+    return times
+
+
+def bench_properties(corpus, repeat):
+    """
+    A function to time the property checks on every corpus.
+    """
+    checks = {
+        "is_prime": classifier.is_prime,
+        "is_perfect": classifier.is_perfect,
+        "is_armstrong": classifier.is_armstrong,
+        "digit_sum": classifier.digit_sum,
+    }
+    results = {}
+    for name, func in checks.items():
+        results[name] = {
+            corpus_name: summarize(time_calls(
+                func, numbers, repeat, factorization.factorize.cache_clear))
+            for corpus_name, numbers in corpus.items()}
+    return results
+
+
+def bench_endpoint(corpus, repeat):
+    """
+    A function to time /api/classify-number through the Flask
+    test client, cold and hot, against a stub Numbers API.
+    """
+    with StubNumbersAPI() as stub:
+        os.environ["NUMBERS_API_URL"] = stub.base_url
+        import app as app_module
+        client = app_module.app.test_client()
+
+        def get(n):
+            response = client.get(f"/api/classify-number?number={n}")
+            assert response.status_code == 200, response.status_code
+
+        def clear():
+            factorization.factorize.cache_clear()
+            app_module.responses.entries.clear()
+            app_module.responses.size = 0
+            app_module.fun_fact_store.memory.clear()
+
+        cold = {name: summarize(time_calls(get, numbers, repeat, clear))
+                for name, numbers in corpus.items()}
+        hot = {name: summarize(time_calls(get, numbers, repeat))
+               for name, numbers in corpus.items()}
+    return {"endpoint_cold": cold, "endpoint_hot": hot}
+
+
+def metadata(repeat):
+    """
+    A function to describe the run, so results can be matched up.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+            capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": repeat,
+        "classify_table": classifier.table is not None,
+    }
+
+
+def compare(base_path, new_path):
+    """
+    A function to print how every median moved between two runs.
+    """
+    with open(base_path) as f:
+        base = json.load(f)["results"]
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    print(f"{'benchmark':<16}{'corpus':<14}{'base us':>12}{'new us':>12}{'ratio':>8}")
+    for bench, corpus_results in new.items():
+        for corpus_name, stats in corpus_results.items():
+            old = base.get(bench, {}).get(corpus_name)
+            if old is None:
+                continue
+            ratio = stats["median_us"] / old["median_us"] if old["median_us"] else 1.0
+            flag = ""
+            if ratio > THRESHOLD:
+                flag = "  slower"
+            elif ratio < 1 / THRESHOLD:
+                flag = "  faster"
+            print(f"{bench:<16}{corpus_name:<14}{old['median_us']:>12.1f}"
+                  f"{stats['median_us']:>12.1f}{ratio:>8.2f}{flag}")
+
+
+def main():
+    if sys.argv[1:2] == ["compare"]:
+        if len(sys.argv) != 4:
+            sys.exit(__doc__)
+        compare(sys.argv[2], sys.argv[3])
+        return
+    parser = argparse.ArgumentParser(description="Run the benchmark suite.")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="calls per number (default 5)")
+    parser.add_argument("--output", help="JSON file to write "
+                        "(default benchmarks/results/<date>-<commit>.json)")
+    args = parser.parse_args()
+
+    corpus = corpora()
+    results = bench_properties(corpus, args.repeat)
+    results.update(bench_endpoint(corpus, args.repeat))
+    run = {"meta": metadata(args.repeat), "results": results}
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(RESULTS_DIR, f"{stamp}-{run['meta']['commit']}.json")
+    with open(output, "w") as f:
+        json.dump(run, f, indent=2)
+
+    print(f"{'benchmark':<16}{'corpus':<14}{'median us':>12}{'p95 us':>12}")
+    for bench, corpus_results in results.items():
+        for corpus_name, stats in corpus_results.items():
+            print(f"{bench:<16}{corpus_name:<14}"
+                  f"{stats['median_us']:>12.1f}{stats['p95_us']:>12.1f}")
+    print(f"wrote {output}")
+
+
+if __name__ == "__main__":
+    main()
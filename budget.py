@@ -0,0 +1,102 @@
+"""
+Per-request compute budgets.
+The property checks call check() from inside their long
+loops; once the budget set by limit() for the current
+request has run out, check() raises BudgetExceeded so the
+request can fail cleanly instead of tying up the worker.
+The budget lives in a context variable, so every thread and
+asyncio task has its own.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from os import environ
+from threading import Lock
+from time import monotonic
+import metrics
+
+# Seconds of computation one request may use
+COMPUTE_BUDGET = float(environ.get("COMPUTE_BUDGET", 2.0))
+
+deadline = ContextVar("compute_deadline", default=None)
+
+# Budgets started, and property checks cut short by one
+stats = {"budgets": 0, "exceeded": 0}
+stats_lock = Lock()
+
+
+# Returned by run() in place of a result that ran out of budget
+TIMEOUT = "timeout"
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised when a computation runs past its request's budget.
+    """
+
+
+@contextmanager
+def limit(seconds=COMPUTE_BUDGET):
+    """
+    A context manager that gives the code inside it seconds
+    of compute time.
+    """
+    with stats_lock:
+        stats["budgets"] += 1
+    token = deadline.set(monotonic() + seconds)
+    try:
+        yield
+    finally:
+        deadline.reset(token)
+
+
+def check():
+    """
+    A function to raise BudgetExceeded if the current budget
+    has run out. It does nothing outside limit().
+    """
+    end = deadline.get()
+    if end is not None and monotonic() > end:
+        raise BudgetExceeded("compute budget exceeded")
+
+
+def run(fn, *args):
+    """
+    A function to call fn(*args) within the current budget,
+    returning TIMEOUT instead of raising if the budget runs out.
+    """
+    try:
+        return fn(*args)
+    except BudgetExceeded:
+        count_exceeded(1)
+        return TIMEOUT
+
+
+def count_exceeded(checks):
+    """
+    A function to add checks cut short elsewhere, such as in
+    a worker process, to the counters.
+    """
+    with stats_lock:
+        stats["exceeded"] += checks
+
+
+def report():
+    """
+    A function to return the configured budget and the counters.
+    """
+    with stats_lock:
+        return {"compute_budget": COMPUTE_BUDGET, **stats}
+
+
+def collect_stats():
+    """
+    A function to report the checks cut short to /metrics.
+    """
+    with stats_lock:
+        exceeded = stats["exceeded"]
+    return [("budget_exceeded_total", "counter",
+             "Property checks cut short by the compute budget.",
+             [({}, exceeded)])]
+
+
+metrics.register(collect_stats)
@@ -0,0 +1,140 @@
+"""
+The mathematical properties behind /api/classify-number.
+These functions are shared by the Flask app (app.py) and
+the asyncio app (asgi_app.py), so both serving modes
+return exactly the same classification.
+"""
+import armstrong
+import budget
+import classify_table
+import digits
+import factorization
+import metrics
+import sieve
+
+# Precomputed classifications of small numbers, if the table was built
+table = classify_table.load()
+
+# classify_many sieves the whole span when it is at most this
+# many times longer than the list of numbers
+DENSE_SPAN_FACTOR = 4
+
+
+def is_prime(n):
+    """
+    A function to check if a number is prime.
+    """
+    return factorization.factorize(n).is_prime
+
+
+def is_perfect(n):
+    """
+    A function to check if a number is perfect.
+    """
+    return factorization.factorize(n).is_perfect
+
+
+def is_armstrong(n, base=10):
+    """
+    A function to check if a number is an Armstrong number.
+    """
+    return armstrong.is_armstrong(n, base)
+
+
+# def is_float(value):
+#     """
+#     A function to check if a value is a valid float.
+#     """
+#     try:
+#         float(value)  # Try to convert to float
+#         return True
+#     except ValueError:
+#         return False
+
+
+def digit_sum(n):
+    """
+    A function to calculate the sum of the digits of a number.
+    """
+    return digits.digit_sum(n)
+
+
+def classify(number):
+    """
+    A function to build the classification of a number,
+    everything in the response except the fun fact. If the
+    compute budget runs out, the checks it cut short are
+    null and listed under "timeouts".
+    """
+    if table is not None and number in table:
+        with metrics.timer("table"):
+            return table.classify(number)
+    # Both checks read from the same cached factorization
+    facts = factorization.factorize(number)
+    with metrics.timer("prime"):
+        prime = budget.run(lambda: facts.is_prime)
+    with metrics.timer("perfect"):
+        perfect = budget.run(lambda: facts.is_perfect)
+    with metrics.timer("armstrong"):
+        armstrong = is_armstrong(number)
+    with metrics.timer("digit_sum"):
+        sum_digits = digit_sum(number)
+    parity = "odd" if number % 2 != 0 else "even"
+    # Checking for Armstrong properties and parity
+    properties = []
+    if armstrong:
+        properties.append("armstrong")
+    properties.append(parity)
+    data = {
+        "number": number,
+        "is_prime": None if prime == budget.TIMEOUT else prime,
+        "is_perfect": None if perfect == budget.TIMEOUT else perfect,
+        "properties": properties,
+        "digit_sum": sum_digits,
+    }
+    timeouts = [name for name, value in (("is_prime", prime), ("is_perfect", perfect))
+                if value == budget.TIMEOUT]
+    if timeouts:
+        data["timeouts"] = timeouts
+    return data
+
+
+def timed_out(number):
+    """
+    A function to build the classification of a number whose
+    primality and perfect checks ran out of budget before they
+    started. The cheap checks are still done.
+    """
+    properties = ["armstrong"] if is_armstrong(number) else []
+    properties.append("odd" if number % 2 != 0 else "even")
+    return {
+        "number": number,
+        "is_prime": None,
+        "is_perfect": None,
+        "properties": properties,
+        "digit_sum": digit_sum(number),
+        "timeouts": ["is_prime", "is_perfect"],
+    }
+
+
+def classify_many(numbers):
+    """
+    A function to classify several numbers in one pass,
+    returning the classifications in the same order.
+    Numbers that lie close together are classified with
+    the range sieve; scattered ones one at a time.
+    """
+    if not numbers:
+        return []
+    low, high = min(numbers), max(numbers)
+    span = high - low + 1
+    if span > DENSE_SPAN_FACTOR * len(numbers) or not (
+            -sieve.SIEVE_MAX <= low and high <= sieve.SIEVE_MAX):
+        return [classify(number) for number in numbers]
+    wanted = set(numbers)
+    found = {}
+    for chunk in sieve.classify_range(low, high):
+        for data in chunk:
+            if data["number"] in wanted:
+                found[data["number"]] = data
+    return [found[number] for number in numbers]
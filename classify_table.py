@@ -0,0 +1,167 @@
+"""
+A precomputed classification table for small numbers.
+Most requests ask about numbers below a few million, so the
+primality, perfect and Armstrong flags and the digit sum of
+every number below CLASSIFY_TABLE_SIZE are worked out once
+with the range sieves and written to a binary file. The file
+holds a header, three bitsets (one bit per number) and one
+digit-sum byte per number. Parity needs no table.
+
+The app maps the file read-only, so every worker process
+shares the same pages and a lookup reads a few bytes straight
+from the mapping. Numbers outside the table are classified
+with the live algorithms.
+
+Build and check it with:
+    python classify_table.py build [size]
+    python classify_table.py check [samples]
+"""
+from math import isqrt
+from os import environ, replace
+import mmap
+import random
+import struct
+import sys
+import numpy as np
+import sieve
+
+# Binary file holding the table ("" turns it off)
+CLASSIFY_TABLE_PATH = environ.get("CLASSIFY_TABLE_PATH", "classify_table.bin")
+
+# Numbers 0 .. size - 1 are tabulated by the build step
+CLASSIFY_TABLE_SIZE = int(environ.get("CLASSIFY_TABLE_SIZE", 10 ** 7))
+
+MAGIC = b"NCT1"
+HEADER = struct.Struct("<4sQ")
+
+# Order of the bitsets in the file
+FLAGS = ("is_prime", "is_perfect", "armstrong")
+
+
+class ClassifyTable:
+    """
+    A read-only view of a table file.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.size = HEADER.unpack_from(self.map)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a classification table")
+        bitset = (self.size + 7) // 8
+        self.offsets = [HEADER.size + i * bitset for i in range(len(FLAGS))]
+        self.sums_offset = HEADER.size + len(FLAGS) * bitset
+        if len(self.map) != self.sums_offset + self.size:
+            raise ValueError(f"{path} is truncated")
+
+    def __contains__(self, n):
+        return 0 <= n < self.size
+
+    def flag(self, index, n):
+        """
+        A function to read one of the bitsets for n.
+        """
+        return bool(self.map[self.offsets[index] + (n >> 3)] >> (n & 7) & 1)
+
+    def classify(self, n):
+        """
+        A function to build the classification of a tabulated
+        number, in the same shape as classifier.classify.
+        """
+        properties = ["armstrong"] if self.flag(2, n) else []
+        properties.append("odd" if n & 1 else "even")
+        return {
+            "number": n,
+            "is_prime": self.flag(0, n),
+            "is_perfect": self.flag(1, n),
+            "properties": properties,
+            "digit_sum": self.map[self.sums_offset + n],
+        }
+
+
+def load(path=CLASSIFY_TABLE_PATH):
+    """
+    A function to map the table file, or return None if
+    there is no table to use.
+    """
+    if not path:
+        return None
+    try:
+        return ClassifyTable(path)
+    except FileNotFoundError:
+        return None
+
+
+def build(path=CLASSIFY_TABLE_PATH, size=CLASSIFY_TABLE_SIZE):
+    """
+    A function to compute the table for 0 .. size - 1 and
+    write it to path, replacing any previous table at once.
+    """
+    # Segments are a multiple of 8 long, so their bits pack cleanly
+    segment = sieve.SEGMENT_SIZE
+    primes = sieve.base_primes(isqrt(size) + 1)
+    bitsets = [[] for _ in FLAGS]
+    sums = []
+    for lo in range(0, size, segment):
+        hi = min(lo + segment, size)
+        values = np.arange(lo, hi, dtype=np.int64)
+        prime = np.zeros(hi - lo, dtype=bool)
+        perfect = np.zeros(hi - lo, dtype=bool)
+        start = max(lo, 2)
+        if start < hi:
+            prime[start - lo:] = sieve.prime_flags(start, hi, primes)
+            perfect[start - lo:] = (
+                sieve.divisor_sums(start, hi, primes) == 2 * values[start - lo:])
+        armstrong = np.isin(values, sieve.ARMSTRONG_ARRAY)
+        for bits, flags in zip(bitsets, (prime, perfect, armstrong)):
+            bits.append(np.packbits(flags, bitorder="little").tobytes())
+        sums.append(sieve.digit_sums(values).astype(np.uint8).tobytes())
+    partial = path + ".tmp"
+    with open(partial, "wb") as f:
+        f.write(HEADER.pack(MAGIC, size))
+        for bits in bitsets:
+            f.write(b"".join(bits))
+        f.write(b"".join(sums))
+    replace(partial, path)
+
+
+def check(table, samples=100000):
+    """
+    A function to compare the table with the live checks for
+    the edges of the table and a random sample of numbers,
+    returning the numbers that disagree.
+    """
+    # The app's own checks; imported here since classifier loads the table
+    from classifier import digit_sum, is_armstrong, is_perfect, is_prime
+    numbers = set(range(min(table.size, 10000)))
+    numbers.update(range(max(table.size - 1000, 0), table.size))
+    numbers.update(n for n in sieve.ARMSTRONG_ARRAY.tolist() if n in table)
+    numbers.update(n for n in (6, 28, 496, 8128, 33550336) if n in table)
+    numbers.update(random.randrange(table.size) for _ in range(samples))
+    wrong = []
+    for n in sorted(numbers):
+        data = table.classify(n)
+        if (data["is_prime"] != is_prime(n)
+                or data["is_perfect"] != is_perfect(n)
+                or ("armstrong" in data["properties"]) != is_armstrong(n)
+                or data["digit_sum"] != digit_sum(n)):
+            wrong.append(n)
+    return wrong
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "build"
+    if command == "build":
+        size = int(sys.argv[2]) if len(sys.argv) > 2 else CLASSIFY_TABLE_SIZE
+        build(CLASSIFY_TABLE_PATH, size)
+        print(f"wrote {CLASSIFY_TABLE_PATH} for 0 .. {size - 1}")
+    elif command == "check":
+        table = load()
+        if table is None:
+            sys.exit(f"{CLASSIFY_TABLE_PATH} not found; run the build first")
+        wrong = check(table, int(sys.argv[2]) if len(sys.argv) > 2 else 100000)
+        print(f"{len(wrong)} mismatches" + (f", first {wrong[:10]}" if wrong else ""))
+        sys.exit(1 if wrong else 0)
+    else:
+        sys.exit(__doc__)
@@ -0,0 +1,169 @@
+"""
+Digit statistics without string conversion.
+A number is split into limbs of several digits each (four
+in base 10) with divmod, and every limb is looked up in
+precomputed tables, so the digit count, digit sum, digit
+histogram and power sums all come out of one pass. Numbers
+that fit in a machine word are split with a simple loop;
+larger ones are split by divide and conquer against cached
+powers of the limb base, which also sidesteps Python's limit
+on converting huge integers to strings.
+"""
+from functools import lru_cache
+from threading import Lock
+
+# Limbs hold at most this many values, so the tables stay small
+LIMB_TABLE_SIZE = 10 ** 4
+
+# Numbers below this are split with a plain divmod loop
+WORD_LIMIT = 1 << 64
+
+
+class DigitStats:
+    """
+    The digit count, digit sum and digit histogram of a number.
+    """
+    __slots__ = ("count", "total", "histogram", "base")
+
+    def __init__(self, count, total, histogram, base):
+        self.count = count
+        self.total = total
+        self.histogram = histogram
+        self.base = base
+
+    def power_sum(self, power):
+        """
+        The sum of every digit raised to power.
+        """
+        return sum(times * digit ** power
+                   for digit, times in enumerate(self.histogram) if times)
+
+
+class LimbTables:
+    """
+    Lookup tables for the limbs of one base.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.width = 1
+        while base ** (self.width + 1) <= LIMB_TABLE_SIZE:
+            self.width += 1
+        self.limb = base ** self.width
+        self.sums = [0] * self.limb
+        self.lengths = [1] * self.limb
+        for value in range(1, self.limb):
+            rest, digit = divmod(value, base)
+            self.sums[value] = self.sums[rest] + digit
+            self.lengths[value] = self.lengths[rest] + 1 if rest else 1
+        self._histograms = None
+        # powers[j] is limb ** (2 ** j), grown as larger numbers arrive
+        self.powers = [self.limb]
+        self.powers_lock = Lock()
+
+    @property
+    def histograms(self):
+        """
+        The digit histogram of every limb, padded with leading zeros.
+        """
+        if self._histograms is None:
+            table = []
+            for value in range(self.limb):
+                counts = [0] * self.base
+                for _ in range(self.width):
+                    value, digit = divmod(value, self.base)
+                    counts[digit] += 1
+                table.append(counts)
+            self._histograms = table
+        return self._histograms
+
+    def split(self, n):
+        """
+        A function to split a non-negative number into limbs,
+        least significant first. Inner limbs may be zero; the
+        last one is only zero when n is zero.
+        """
+        if n < WORD_LIMIT:
+            limbs = []
+            while n >= self.limb:
+                n, limb = divmod(n, self.limb)
+                limbs.append(limb)
+            limbs.append(n)
+            return limbs
+        level = 0
+        while True:
+            if level == len(self.powers):
+                with self.powers_lock:
+                    if level == len(self.powers):
+                        self.powers.append(self.powers[-1] ** 2)
+            if n < self.powers[level]:
+                break
+            level += 1
+        limbs = []
+        self._split_into(n, level, limbs)
+        while len(limbs) > 1 and limbs[-1] == 0:
+            limbs.pop()
+        return limbs
+
+    def _split_into(self, n, level, limbs):
+        """
+        A function to append exactly 2 ** level limbs of n,
+        which must be below limb ** (2 ** level).
+        """
+        if level == 0:
+            limbs.append(n)
+            return
+        high, low = divmod(n, self.powers[level - 1])
+        self._split_into(low, level - 1, limbs)
+        self._split_into(high, level - 1, limbs)
+
+
+@lru_cache(maxsize=None)
+def limb_tables(base):
+    """
+    A function to return the shared limb tables for a base.
+    """
+    if base < 2:
+        raise ValueError("base must be at least 2")
+    return LimbTables(base)
+
+
+def digit_sum(n, base=10):
+    """
+    A function to calculate the sum of the digits of a number.
+    """
+    tables = limb_tables(base)
+    sums = tables.sums
+    n = abs(n)
+    if n < tables.limb:
+        return sums[n]
+    return sum(sums[limb] for limb in tables.split(n))
+
+
+def digit_count(n, base=10):
+    """
+    A function to count the digits of a number.
+    """
+    tables = limb_tables(base)
+    limbs = tables.split(abs(n))
+    return tables.width * (len(limbs) - 1) + tables.lengths[limbs[-1]]
+
+
+def digit_stats(n, base=10):
+    """
+    A function to compute the digit count, digit sum and digit
+    histogram of a number in one pass over its limbs.
+    """
+    tables = limb_tables(base)
+    limbs = tables.split(abs(n))
+    histograms = tables.histograms
+    counts = [0] * base
+    total = 0
+    for limb in limbs:
+        total += tables.sums[limb]
+        for digit, times in enumerate(histograms[limb]):
+            counts[digit] += times
+    count = tables.width * (len(limbs) - 1) + tables.lengths[limbs[-1]]
+    # The top limb was counted with leading zeros it does not have
+    counts[0] -= tables.width - tables.lengths[limbs[-1]]
+    return DigitStats(count, total, counts, base)
@@ -0,0 +1,176 @@
+"""
+Factorization and divisor sums for the Number Classification API.
+Small factors are removed with a 2-3-5 wheel, larger ones
+are found with Pollard's rho using Brent's cycle detection,
+and the sum of divisors is computed from the prime powers.
+"""
+from math import gcd
+import budget
+import primality
+
+# Trial division with the wheel stops at this bound
+WHEEL_LIMIT = 1000
+
+# Offsets between numbers coprime to 30, starting from 7
+WHEEL_30 = (4, 2, 4, 2, 4, 6, 2, 6)
+
+# Exponents p of the known Mersenne primes 2^p - 1
+MERSENNE_EXPONENTS = (
+    2, 3, 5, 7, 13, 17, 19, 31, 61, 89, 107, 127, 521, 607, 1279,
+    2203, 2281, 3217, 4253, 4423, 9689, 9941, 11213, 19937, 21701,
+    23209, 44497, 86243, 110503, 132049, 216091, 756839, 859433,
+    1257787, 1398269, 2976221, 3021377, 6972593, 13466917,
+    20996011, 24036583, 25964951, 30402457, 32582657, 37156667,
+    42643801, 43112609, 57885161, 74207281, 77232917, 82589933,
+    136279841,
+)
+MERSENNE_EXPONENT_SET = frozenset(MERSENNE_EXPONENTS)
+
+# Every Mersenne exponent below this bound is in the table above
+MERSENNE_VERIFIED_LIMIT = 57885161
+
+# There is no odd perfect number below 10^1500 (Ochem and Rao, 2012)
+ODD_PERFECT_BOUND = 10 ** 1500
+
+# Even perfect numbers small enough to keep as plain integers
+PERFECT_NUMBERS = frozenset(
+    (1 << (p - 1)) * ((1 << p) - 1) for p in MERSENNE_EXPONENTS if p <= 127
+)
+
+
+def pollard_brent(n):
+    """
+    A function to find a nontrivial factor of an odd
+    composite number using Pollard's rho with Brent's
+    cycle detection.
+    """
+    c = 1
+    while True:
+        y, r, q = 2, 1, 1
+        m = 128
+        g = 1
+        while g == 1:
+            x = y
+            for _ in range(r):
+                y = (y * y + c) % n
+            k = 0
+            while k < r and g == 1:
+                budget.check()
+                ys = y
+                # Batch the gcd over up to m steps of the walk
+                for _ in range(min(m, r - k)):
+                    y = (y * y + c) % n
+                    q = q * abs(x - y) % n
+                g = gcd(q, n)
+                k += m
+            r *= 2
+        if g == n:
+            # The batch overshot; step through it one at a time
+            g = 1
+            while g == 1:
+                budget.check()
+                ys = (ys * ys + c) % n
+                g = gcd(abs(x - ys), n)
+        if g != n:
+            return g
+        c += 1
+
+
+def factor(n):
+    """
+    A function to factor a positive integer into
+    a dict mapping each prime factor to its exponent.
+    """
+    if n < 1:
+        raise ValueError("factor() needs a positive integer")
+    factors = {}
+    for p in (2, 3, 5):
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+    p = 7
+    i = 0
+    while p < WHEEL_LIMIT and p * p <= n:
+        while n % p == 0:
+            factors[p] = factors.get(p, 0) + 1
+            n //= p
+        p += WHEEL_30[i]
+        i = (i + 1) % 8
+    if n == 1:
+        return factors
+    if p * p > n:
+        factors[n] = factors.get(n, 0) + 1
+        return factors
+
+    # Split the remaining cofactor with Pollard's rho
+    stack = [n]
+    while stack:
+        m = stack.pop()
+        if primality.is_prime(m):
+            factors[m] = factors.get(m, 0) + 1
+            continue
+        d = pollard_brent(m)
+        stack.append(d)
+        stack.append(m // d)
+    return dict(sorted(factors.items()))
+
+
+def sigma_from_factors(factors):
+    """
+    A function to compute the sum of divisors
+    from a prime factorization.
+    """
+    total = 1
+    for p, e in factors.items():
+        total *= (p ** (e + 1) - 1) // (p - 1)
+    return total
+
+
+def sigma(n):
+    """
+    A function to compute the sum of all
+    positive divisors of a number.
+    """
+    return sigma_from_factors(factor(n))
+
+
+def even_perfect_exponent(n):
+    """
+    A function to return p if an even number n has the
+    Euclid-Euler form 2^(p-1) * (2^p - 1), and None otherwise.
+    """
+    k = (n & -n).bit_length() - 1
+    p = k + 1
+    if n >> k != (1 << p) - 1:
+        return None
+    return p
+
+
+def is_even_perfect(n):
+    """
+    A function to check if an even number is perfect.
+    """
+    if n in PERFECT_NUMBERS:
+        return True
+    # Every even perfect number has the Euclid-Euler form
+    p = even_perfect_exponent(n)
+    if p is None:
+        return False
+    if p in MERSENNE_EXPONENT_SET:
+        return True
+    if p < MERSENNE_VERIFIED_LIMIT:
+        return False
+    return primality.is_prime((1 << p) - 1)
+
+
+def is_perfect(n):
+    """
+    A function to check if a number is perfect.
+    """
+    if n < 2:
+        return False
+    if n % 2 == 0:
+        return is_even_perfect(n)
+    if n < ODD_PERFECT_BOUND:
+        return False
+    return sigma(n) == 2 * n
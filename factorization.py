@@ -0,0 +1,116 @@
+"""
+A shared, cached factorization of the numbers the API classifies.
+factorize(n) returns one Factorization per number, and every
+divisor-based property (primality, the divisor sum, perfect,
+abundant or deficient) is derived from it, so a number is
+factored at most once while it stays in the cache.
+"""
+from functools import lru_cache
+from os import environ
+import divisors
+import metrics
+import primality
+
+# How many factorizations to keep (least recently used are dropped)
+FACTOR_CACHE_SIZE = int(environ.get("FACTOR_CACHE_SIZE", 4096))
+
+
+class Factorization:
+    """
+    The prime factorization of an integer and the properties
+    derived from it. The factors are only computed when a
+    property needs them, so checking primality alone stays cheap.
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self._factors = None
+        self._is_prime = None
+
+    @property
+    def factors(self):
+        """
+        A dict mapping each prime factor to its exponent,
+        or an empty dict for numbers below 1.
+        """
+        if self._factors is None:
+            self._factors = divisors.factor(self.n) if self.n >= 1 else {}
+        return self._factors
+
+    @property
+    def is_prime(self):
+        """
+        Whether the number is prime.
+        """
+        if self._is_prime is None:
+            if self._factors is not None:
+                self._is_prime = list(self._factors.values()) == [1] and self.n > 1
+            else:
+                self._is_prime = primality.is_prime(self.n)
+        return self._is_prime
+
+    @property
+    def sigma(self):
+        """
+        The sum of all positive divisors, or None for numbers below 1.
+        """
+        if self.n < 1:
+            return None
+        if self.is_prime:
+            return self.n + 1
+        return divisors.sigma_from_factors(self.factors)
+
+    @property
+    def aliquot_sum(self):
+        """
+        The sum of the proper divisors, or None for numbers below 1.
+        """
+        if self.n < 1:
+            return None
+        return self.sigma - self.n
+
+    @property
+    def is_perfect(self):
+        """
+        Whether the number is perfect.
+        """
+        if self.n < 2:
+            return False
+        if self.n % 2 == 0:
+            return divisors.is_even_perfect(self.n)
+        if self.n < divisors.ODD_PERFECT_BOUND or self.is_prime:
+            return False
+        return self.aliquot_sum == self.n
+
+    @property
+    def classification(self):
+        """
+        "perfect", "abundant" or "deficient", or None for numbers below 1.
+        """
+        if self.n < 1:
+            return None
+        if self.is_perfect:
+            return "perfect"
+        return "abundant" if self.aliquot_sum > self.n else "deficient"
+
+
+@lru_cache(maxsize=FACTOR_CACHE_SIZE)
+def factorize(n):
+    """
+    A function to return the shared Factorization of a number.
+    Use factorize.cache_info() for the hit and miss counters.
+    """
+    return Factorization(n)
+
+
+def collect_stats():
+    """
+    A function to report the factorization cache counters
+    to /metrics.
+    """
+    info = factorize.cache_info()
+    return [metrics.stats_family("factor_cache_total", "Factorization cache lookups.",
+                                 {"hit": info.hits, "miss": info.misses})]
+
+
+metrics.register(collect_stats)
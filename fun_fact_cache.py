@@ -0,0 +1,509 @@
+"""
+A two-tier cache for Numbers API fun facts.
+Facts live in an in-process LRU backed by a SQLite file
+that survives restarts. Fresh entries are served directly,
+stale ones are served while a background thread refreshes
+them, and upstream failures are cached for a short time
+so a failing API is not hammered by every request.
+Concurrent misses for the same number share one upstream call.
+The same cache serves threads through get() and asyncio tasks
+through get_async().
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from os import environ, getpid
+from threading import Lock, Thread
+from time import monotonic, time
+import asyncio
+import sqlite3
+from numbers_api import TOO_LARGE, NotAsked, NumbersAPIError, too_large
+from singleflight import AsyncSingleFlight, SingleFlight
+import metrics
+
+# SQLite file for the on-disk tier ("" keeps the cache in memory only)
+FUN_FACT_CACHE_PATH = environ.get("FUN_FACT_CACHE_PATH", "fun_facts.db")
+
+# Entries kept in memory and on disk
+FUN_FACT_MEMORY_ENTRIES = int(environ.get("FUN_FACT_MEMORY_ENTRIES", 10000))
+FUN_FACT_DISK_ENTRIES = int(environ.get("FUN_FACT_DISK_ENTRIES", 1000000))
+
+# Seconds a fact is fresh, then how long it may still be served stale
+FUN_FACT_TTL = float(environ.get("FUN_FACT_TTL", 7 * 24 * 3600))
+FUN_FACT_STALE_TTL = float(environ.get("FUN_FACT_STALE_TTL", 30 * 24 * 3600))
+
+# Seconds an upstream failure is remembered
+FUN_FACT_NEGATIVE_TTL = float(environ.get("FUN_FACT_NEGATIVE_TTL", 30))
+
+# Disk evictions run once every this many writes
+EVICT_EVERY = 100
+
+# Numbers per upstream batch request, and batches fetched at once
+FUN_FACT_BATCH_SIZE = int(environ.get("FUN_FACT_BATCH_SIZE", 100))
+FUN_FACT_BATCH_THREADS = int(environ.get("FUN_FACT_BATCH_THREADS", 4))
+
+# How each lookup state is reported in a request's stage notes
+CACHE_NOTES = {"fresh": "hit", "stale": "stale", "negative": "negative"}
+
+
+def time_left(deadline):
+    """
+    A function to return the seconds until a monotonic()
+    deadline, or None if there is none.
+    """
+    return None if deadline is None else max(deadline - monotonic(), 0)
+
+
+class Entry:
+    """
+    A cached fun fact, or the error that came back instead.
+    """
+    __slots__ = ("text", "error", "fetched_at")
+
+    def __init__(self, text, error, fetched_at):
+        self.text = text
+        self.error = error
+        self.fetched_at = fetched_at
+
+
+class DiskStore:
+    """
+    The SQLite tier of the fun fact cache.
+    """
+
+    def __init__(self, path, max_entries):
+        self.path = path
+        self.max_entries = max_entries
+        self.lock = Lock()
+        self.writes = 0
+        self.db = None
+        self.pid = None
+        self.inherited = None
+
+    def connect(self):
+        """
+        A function to return this process's connection, opening
+        it on first use. SQLite connections must not be used
+        across a fork, so a forked worker opens its own; the
+        parent's is kept, unused, since closing it in the child
+        could checkpoint the parent's WAL.
+        """
+        if self.pid == getpid():
+            return self.db
+        if self.db is not None:
+            self.inherited = self.db
+        self.db = sqlite3.connect(self.path, check_same_thread=False,
+                                  isolation_level=None)
+        self.pid = getpid()
+        # WAL lets several worker processes share the file
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS facts ("
+            "number TEXT PRIMARY KEY, text TEXT, error TEXT, "
+            "fetched_at REAL, accessed_at REAL)")
+        self.db.execute(
+            "CREATE INDEX IF NOT EXISTS facts_accessed ON facts (accessed_at)")
+        return self.db
+
+    def get(self, key):
+        """
+        A function to load an entry, or None if it is not stored.
+        """
+        with self.lock:
+            db = self.connect()
+            row = db.execute(
+                "SELECT text, error, fetched_at FROM facts WHERE number = ?",
+                (key,)).fetchone()
+            if row is not None:
+                db.execute(
+                    "UPDATE facts SET accessed_at = ? WHERE number = ?",
+                    (time(), key))
+        return Entry(*row) if row is not None else None
+
+    def put(self, key, entry):
+        """
+        A function to store an entry, evicting the least
+        recently used ones when the store is over its cap.
+        """
+        self.put_many({key: entry})
+
+    def put_many(self, entries):
+        """
+        A function to store several entries in one transaction.
+        """
+        now = time()
+        rows = [(key, entry.text, entry.error, entry.fetched_at, now)
+                for key, entry in entries.items()]
+        with self.lock:
+            db = self.connect()
+            db.execute("BEGIN")
+            db.executemany(
+                "INSERT OR REPLACE INTO facts VALUES (?, ?, ?, ?, ?)", rows)
+            db.execute("COMMIT")
+            before = self.writes
+            self.writes += len(rows)
+            if self.writes // EVICT_EVERY != before // EVICT_EVERY:
+                db.execute(
+                    "DELETE FROM facts WHERE number IN ("
+                    "SELECT number FROM facts ORDER BY accessed_at DESC "
+                    "LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def close(self):
+        with self.lock:
+            if self.db is not None and self.pid == getpid():
+                self.db.close()
+                self.db = None
+                self.pid = None
+
+
+class FunFactCache:
+    """
+    Serves fun facts from memory, then disk, then the Numbers API.
+    fetch(number, deadline) must return the fact text or raise
+    NumbersAPIError. fetch_many(numbers, deadline), if given, must
+    return a dict mapping numbers to facts in one upstream call.
+    async_fetch(number, deadline) is the coroutine counterpart of
+    fetch used by get_async(); a cache needs only the one its
+    callers use.
+    Every function in listeners is called with the key of each
+    entry that is stored, so copies of a fact can be dropped.
+    """
+
+    def __init__(self, fetch=None, fetch_many=None, path=FUN_FACT_CACHE_PATH,
+                 memory_entries=FUN_FACT_MEMORY_ENTRIES,
+                 disk_entries=FUN_FACT_DISK_ENTRIES,
+                 ttl=FUN_FACT_TTL, stale_ttl=FUN_FACT_STALE_TTL,
+                 negative_ttl=FUN_FACT_NEGATIVE_TTL, async_fetch=None):
+        self.fetch = fetch
+        self.fetch_many = fetch_many
+        self.async_fetch = async_fetch
+        self.memory_entries = memory_entries
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.memory = OrderedDict()
+        self.lock = Lock()
+        self.refreshing = set()
+        self.retry_after = {}
+        self.flight = SingleFlight()
+        self.async_flight = AsyncSingleFlight()
+        # Running async refreshes, kept so they are not garbage collected
+        self.background = set()
+        self.disk = DiskStore(path, disk_entries) if path else None
+        self.listeners = []
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "stale_hits": 0,
+                      "negative_hits": 0, "misses": 0, "refreshes": 0}
+
+    def remember(self, key, entry):
+        """
+        A function to put an entry in the memory tier.
+        """
+        with self.lock:
+            self.memory[key] = entry
+            self.memory.move_to_end(key)
+            while len(self.memory) > self.memory_entries:
+                self.memory.popitem(last=False)
+
+    def lookup(self, key):
+        """
+        A function to find an entry in memory or on disk.
+        """
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return entry
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.remember(key, entry)
+                self.stats["disk_hits"] += 1
+        return entry
+
+    def store(self, key, entry):
+        """
+        A function to write an entry to both tiers.
+        """
+        self.remember(key, entry)
+        if self.disk is not None:
+            self.disk.put(key, entry)
+        for listener in self.listeners:
+            listener(key)
+
+    def store_many(self, entries):
+        """
+        A function to write several entries to both tiers.
+        """
+        for key, entry in entries.items():
+            self.remember(key, entry)
+        if self.disk is not None and entries:
+            self.disk.put_many(entries)
+        for key in entries:
+            for listener in self.listeners:
+                listener(key)
+
+    def load(self, number, deadline=None):
+        """
+        A function to fetch a fact from upstream and cache
+        the result, whether it is a fact or an upstream error.
+        Concurrent loads of the same number share one upstream call.
+        """
+        key = str(number)
+
+        def fetch():
+            try:
+                text = self.fetch(number, deadline)
+            except NumbersAPIError as e:
+                return self.settle(key, None, e)
+            return self.settle(key, text)
+
+        try:
+            return self.flight.do(key, fetch, time_left(deadline))
+        except TimeoutError:
+            raise NumbersAPIError("deadline exceeded")
+
+    async def load_async(self, number, deadline=None):
+        """
+        The asyncio counterpart of load(): concurrent loads of the
+        same number in one event loop share one upstream call.
+        """
+        key = str(number)
+
+        async def fetch():
+            try:
+                text = await self.async_fetch(number, deadline)
+            except NumbersAPIError as e:
+                return self.settle(key, None, e)
+            return self.settle(key, text)
+
+        try:
+            return await asyncio.wait_for(self.async_flight.do(key, fetch),
+                                          time_left(deadline))
+        except asyncio.TimeoutError:
+            raise NumbersAPIError("deadline exceeded")
+
+    def settle(self, key, text, error=None):
+        """
+        A function to cache the outcome of a load, the fact or
+        the upstream error, and return its entry.
+        """
+        entry = Entry(text, None if error is None else str(error), time())
+        if not isinstance(error, NotAsked):
+            # Otherwise nothing was asked upstream, so there is nothing to remember
+            self.store(key, entry)
+        return entry
+
+    def refresh(self, number):
+        """
+        A function to reload a stale entry in the background.
+        If the reload fails the stale fact is kept, and no new
+        reload is tried until the negative TTL has passed.
+        """
+        key = str(number)
+        if not self.start_refresh(key):
+            return
+
+        def run():
+            text = None
+            try:
+                text = self.fetch(number, None)
+            except NumbersAPIError:
+                pass
+            finally:
+                self.finish_refresh(key, text)
+
+        Thread(target=run, daemon=True).start()
+
+    def refresh_async(self, number):
+        """
+        The asyncio counterpart of refresh(): the reload runs as
+        a task on the current event loop.
+        """
+        key = str(number)
+        if not self.start_refresh(key):
+            return
+
+        async def run():
+            text = None
+            try:
+                text = await self.async_fetch(number, None)
+            except NumbersAPIError:
+                pass
+            finally:
+                self.finish_refresh(key, text)
+
+        task = asyncio.ensure_future(run())
+        self.background.add(task)
+        task.add_done_callback(self.background.discard)
+
+    def start_refresh(self, key):
+        """
+        A function to claim the refresh of a stale entry. It
+        returns False if a refresh is already running, or if the
+        last one failed less than the negative TTL ago.
+        """
+        with self.lock:
+            if key in self.refreshing or self.retry_after.get(key, 0) > time():
+                return False
+            self.refreshing.add(key)
+        self.stats["refreshes"] += 1
+        return True
+
+    def finish_refresh(self, key, text):
+        """
+        A function to store the fact a refresh fetched, or with
+        text None, to back off retrying the failed refresh.
+        """
+        if text is not None:
+            self.store(key, Entry(text, None, time()))
+        with self.lock:
+            if text is None:
+                self.retry_after[key] = time() + self.negative_ttl
+            else:
+                self.retry_after.pop(key, None)
+            self.refreshing.discard(key)
+
+    def peek(self, number):
+        """
+        A function to look a number up without going upstream.
+        It returns the entry and its state: "fresh", "stale",
+        "negative" (a remembered failure), or None on a miss.
+        """
+        entry = self.lookup(str(number))
+        if entry is None:
+            return None, None
+        age = time() - entry.fetched_at
+        if entry.error is not None:
+            if age < self.negative_ttl:
+                self.stats["negative_hits"] += 1
+                return entry, "negative"
+        elif age < self.ttl:
+            return entry, "fresh"
+        elif age < self.ttl + self.stale_ttl:
+            self.stats["stale_hits"] += 1
+            return entry, "stale"
+        return None, None
+
+    def cached_fact(self, number):
+        """
+        A function to return the entry holding the fact for a
+        number if it is in memory, or None. Unlike peek() it
+        leaves the counters and the LRU order alone.
+        """
+        with self.lock:
+            entry = self.memory.get(str(number))
+        if entry is None or entry.error is not None:
+            return None
+        return entry
+
+    def cached(self, number, refresh):
+        """
+        A function to serve a number from the cache, returning
+        its entry, or None on a miss. A remembered failure raises
+        NumbersAPIError, and a stale fact is served while
+        refresh(number) reloads it.
+        """
+        entry, state = self.peek(number)
+        metrics.note("fun_fact", CACHE_NOTES.get(state, "miss"))
+        if state == "negative":
+            raise NumbersAPIError(entry.error)
+        if state == "stale":
+            refresh(number)
+        if state is None:
+            self.stats["misses"] += 1
+        return entry
+
+    def get(self, number, deadline=None):
+        """
+        A function to return the fun fact for a number,
+        raising NumbersAPIError if none is available.
+        """
+        entry = self.cached(number, self.refresh)
+        if entry is None:
+            entry = self.load(number, deadline)
+        if entry.error is not None:
+            raise NumbersAPIError(entry.error)
+        return entry.text
+
+    async def get_async(self, number, deadline=None):
+        """
+        The asyncio counterpart of get(), fetching misses with
+        async_fetch.
+        """
+        entry = self.cached(number, self.refresh_async)
+        if entry is None:
+            entry = await self.load_async(number, deadline)
+        if entry.error is not None:
+            raise NumbersAPIError(entry.error)
+        return entry.text
+
+    def load_many(self, numbers, deadline=None):
+        """
+        A function to fetch the facts for several numbers in
+        one upstream batch call and cache the results.
+        """
+        now = time()
+        # Numbers too long for the API are never asked for, so their
+        # refusals are not stored; the keys alone could fill the disk
+        refused = {str(n): Entry(None, TOO_LARGE, now)
+                   for n in numbers if too_large(n)}
+        numbers = [n for n in numbers if not too_large(n)]
+        if not numbers:
+            return refused
+        try:
+            if len(numbers) == 1 or self.fetch_many is None:
+                facts = {n: self.fetch(n, deadline) for n in numbers}
+            else:
+                facts = self.fetch_many(numbers, deadline)
+            entries = {
+                str(n): Entry(facts[n], None, now) if n in facts
+                else Entry(None, "no fact returned", now)
+                for n in numbers}
+        except NotAsked as e:
+            # Nothing was asked upstream, so there is nothing to remember
+            return dict(refused, **{str(n): Entry(None, str(e), now) for n in numbers})
+        except NumbersAPIError as e:
+            entries = {str(n): Entry(None, str(e), now) for n in numbers}
+        self.store_many(entries)
+        return dict(refused, **entries)
+
+    def get_many(self, numbers, deadline=None):
+        """
+        A function to return the fun facts for several numbers.
+        It returns two dicts: number to fact, and number to the
+        error message for the numbers that have no fact.
+        Misses are fetched in batches, several batches at once.
+        """
+        facts = {}
+        errors = {}
+        misses = []
+        for number in numbers:
+            entry, state = self.peek(number)
+            if state == "negative":
+                errors[number] = entry.error
+            elif state is not None:
+                if state == "stale":
+                    self.refresh(number)
+                facts[number] = entry.text
+            else:
+                misses.append(number)
+        self.stats["misses"] += len(misses)
+
+        batches = [misses[i:i + FUN_FACT_BATCH_SIZE]
+                   for i in range(0, len(misses), FUN_FACT_BATCH_SIZE)]
+        if len(batches) > 1:
+            with ThreadPoolExecutor(max_workers=FUN_FACT_BATCH_THREADS) as pool:
+                loaded = list(pool.map(
+                    lambda batch: self.load_many(batch, deadline), batches))
+        else:
+            loaded = [self.load_many(batch, deadline) for batch in batches]
+
+        for batch, entries in zip(batches, loaded):
+            for number in batch:
+                entry = entries[str(number)]
+                if entry.error is not None:
+                    errors[number] = entry.error
+                else:
+                    facts[number] = entry.text
+        return facts, errors
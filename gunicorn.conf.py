@@ -0,0 +1,70 @@
+"""
+Gunicorn settings for serving the Flask app in production.
+Gunicorn reads this file from the working directory, so the
+app is started with just:
+    gunicorn app:app
+
+There is one worker process per CPU (WEB_CONCURRENCY), each with
+WEB_THREADS threads. The property checks hold the GIL, so
+processes give the CPU parallelism. The threads cover the time
+requests spend waiting on the Numbers API. The app is loaded
+once in the master before the workers are forked, so the lookup
+tables, the Armstrong table and the memory-mapped classification
+table and prime index are shared copy-on-write instead of being
+built once per worker.
+
+Reloading:
+    kill -HUP <master>    re-forks the workers with the new
+                          settings; the preloaded code is kept
+    kill -USR2 <master>   starts a new master running the new
+                          code; once it is serving, stop the old
+                          one with kill -QUIT <old master>
+    kill -TERM <master>   stops after in-flight requests finish,
+                          waiting up to GRACEFUL_TIMEOUT seconds
+"""
+from os import cpu_count, environ, path
+
+cpus = cpu_count() or 1
+
+bind = f"0.0.0.0:{environ.get('PORT', 5000)}"
+workers = int(environ.get("WEB_CONCURRENCY", cpus))
+
+# One thread per pooled Numbers API connection (NUMBERS_API_POOL_SIZE)
+threads = int(environ.get("WEB_THREADS", 32))
+worker_class = "gthread"
+
+# Share one copy of the app and its tables between the workers
+preload_app = True
+
+# Each worker's classification pool gets its share of the CPUs
+environ.setdefault("CLASSIFY_PROCESSES", str(max(1, cpus // workers)))
+
+timeout = int(environ.get("WORKER_TIMEOUT", 30))
+graceful_timeout = int(environ.get("GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Worker heartbeats go to memory rather than a possibly slow disk
+if path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = environ.get("ACCESS_LOG") or None
+errorlog = "-"
+loglevel = environ.get("LOG_LEVEL", "info")
+
+
+def when_ready(server):
+    """
+    Stops the classification pool the preloaded app started in
+    the master, so no pool threads or processes are forked.
+    """
+    import offload
+    offload.stop()
+
+
+def post_fork(server, worker):
+    """
+    Starts each worker's own warm classification pool before it
+    accepts requests.
+    """
+    import offload
+    offload.start()
@@ -0,0 +1,81 @@
+"""
+The HTTP caching policy for /api/classify-number.
+The math in a response never changes, but the fun fact does,
+so a response may be cached for as long as the shorter of the
+two lifetimes: MATH_MAX_AGE for the math, and whatever is left
+of the fun fact's freshness for the fact. Caches may then keep
+serving it while they revalidate, for as long as the fact may
+be served stale. A response without a fun fact is only cached
+until the failure would be retried, and a response with a
+timed-out check is not cached at all. Last-Modified is the
+time the fun fact was fetched.
+"""
+from email.utils import formatdate, parsedate_to_datetime
+from os import environ
+from time import time
+import fun_fact_cache
+
+# Seconds the math part of a response stays valid; it never changes
+MATH_MAX_AGE = int(environ.get("MATH_MAX_AGE", 365 * 24 * 3600))
+
+
+def cache_control(expires_at, has_fact=True, now=None):
+    """
+    A function to build the Cache-Control header for a response
+    that is fresh until expires_at (a time() value), or which
+    must not be stored if expires_at is None. Only a response
+    with a fun fact may be served stale.
+    """
+    if expires_at is None:
+        return "no-store"
+    now = time() if now is None else now
+    max_age = max(0, min(MATH_MAX_AGE, int(expires_at - now)))
+    if not has_fact:
+        return f"public, max-age={max_age}"
+    stale = int(fun_fact_cache.FUN_FACT_STALE_TTL)
+    return f"public, max-age={max_age}, stale-while-revalidate={stale}"
+
+
+def headers(cached):
+    """
+    A function to return the caching headers for a cached
+    response: ETag, Cache-Control and, if known, Last-Modified.
+    Only responses with a fun fact have a Last-Modified time.
+    """
+    has_fact = cached.last_modified is not None
+    result = {"ETag": f'"{cached.etag}"',
+              "Cache-Control": cache_control(cached.expires_at, has_fact)}
+    if cached.last_modified is not None:
+        result["Last-Modified"] = formatdate(cached.last_modified, usegmt=True)
+    return result
+
+
+def conditional(cached, request_headers):
+    """
+    A function to return the status and caching headers to
+    answer a request with a cached response: 304 if the client
+    already has it (the body is then left out), otherwise 200.
+    """
+    fresh = not_modified(cached, request_headers.get("If-None-Match"),
+                         request_headers.get("If-Modified-Since"))
+    return (304 if fresh else 200), headers(cached)
+
+
+def not_modified(cached, if_none_match=None, if_modified_since=None):
+    """
+    A function to check if a conditional request can be answered
+    with 304 Not Modified. If-None-Match takes precedence over
+    If-Modified-Since, as RFC 9110 requires.
+    """
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison, so W/"x" matches "x"
+        tags = [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+        return "*" in tags or f'"{cached.etag}"' in tags
+    if if_modified_since and cached.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(cached.last_modified) <= since
+    return False
@@ -0,0 +1,267 @@
+"""
+Request instrumentation in the Prometheus text format.
+Every stage of a request (parsing, each property check, the fun
+fact lookup, serialization) is timed into a histogram with fixed
+buckets, events such as upstream errors are counted, and the
+counters the caches and pools already keep are read through
+collectors when /metrics is scraped. With METRICS_ENABLED=0 the
+timers and counters do nothing; the collectors still report,
+since they cost nothing until a scrape.
+
+A request can also collect its own stage times, enabled or not,
+between start_request() and finish_request(); the profiler and
+the Server-Timing header read them from there.
+"""
+from bisect import bisect_left
+from contextvars import ContextVar
+from os import environ
+from threading import Lock
+from time import perf_counter
+
+METRICS_ENABLED = environ.get("METRICS_ENABLED", "1").lower() not in ("0", "false", "no")
+
+# Prefix of every metric name
+NAMESPACE = "numbers"
+
+# Upper bounds of the histogram buckets, in seconds
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+           0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """
+    Counts of observed values per bucket, plus their sum.
+    """
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.lock = Lock()
+
+    def observe(self, value):
+        i = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[i] += 1
+            self.total += value
+
+
+class Timer:
+    """
+    A context manager that records its duration in a histogram,
+    and in the current request's stage times if there are any.
+    """
+    __slots__ = ("stage", "histogram", "request", "start")
+
+    def __init__(self, stage, histogram, request):
+        self.stage = stage
+        self.histogram = histogram
+        self.request = request
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = perf_counter() - self.start
+        if self.histogram is not None:
+            self.histogram.observe(elapsed)
+        if self.request is not None:
+            self.request.add(self.stage, elapsed)
+
+
+class NullTimer:
+    """
+    The timer handed out when metrics are disabled.
+    """
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class RequestTimes:
+    """
+    The seconds spent in each stage of one request, and a short
+    note per stage, such as whether a cache was hit.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.notes = {}
+        self.start = perf_counter()
+        self.token = None
+
+    def add(self, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def note(self, stage, text):
+        self.notes[stage] = text
+
+    def elapsed(self):
+        return perf_counter() - self.start
+
+
+# The times of the current request, when something wants them
+request_times = ContextVar("request_times", default=None)
+
+stages = {}
+counters = {}
+collectors = []
+lock = Lock()
+
+
+def timer(stage):
+    """
+    A function to return a context manager timing one stage
+    of a request.
+    """
+    request = request_times.get()
+    if not METRICS_ENABLED:
+        if request is None:
+            return NULL_TIMER
+        return Timer(stage, None, request)
+    histogram = stages.get(stage)
+    if histogram is None:
+        with lock:
+            histogram = stages.setdefault(stage, Histogram())
+    return Timer(stage, histogram, request)
+
+
+def start_request():
+    """
+    A function to start collecting the stage times of the
+    current request, returning them. If they are already being
+    collected the same times are shared, and only the caller
+    that started them should finish them.
+    """
+    times = request_times.get()
+    if times is None:
+        times = RequestTimes()
+        times.token = request_times.set(times)
+    return times
+
+
+def finish_request(times):
+    """
+    A function to stop collecting the stage times of the
+    current request, if times were started by this request.
+    """
+    if times.token is None:
+        return
+    token, times.token = times.token, None
+    try:
+        request_times.reset(token)
+    except ValueError:
+        # Finished from a copy of the context; it is discarded anyway
+        pass
+
+
+def note(stage, text):
+    """
+    A function to attach a note to a stage of the current
+    request, if its times are being collected.
+    """
+    times = request_times.get()
+    if times is not None:
+        times.note(stage, text)
+
+
+def count(name, label, value, amount=1):
+    """
+    A function to add to the counter name{label="value"}.
+    """
+    if not METRICS_ENABLED:
+        return
+    key = (name, label, value)
+    with lock:
+        counters[key] = counters.get(key, 0) + amount
+
+
+def register(collector):
+    """
+    A function to add a collector: a function called at every
+    scrape that returns a list of (name, type, help, samples),
+    where samples is a list of (labels dict, value).
+    """
+    collectors.append(collector)
+
+
+def register_caches(fun_fact_store, responses):
+    """
+    A function to add a collector for an app's fun fact and
+    response caches.
+    """
+    def collect_stats():
+        return [
+            stats_family("fun_fact_cache_total",
+                         "Fun fact lookups by outcome.", fun_fact_store.stats),
+            stats_family("response_cache_total", "Response cache events.",
+                         responses.stats, "event"),
+            ("response_cache_bytes", "gauge", "Bytes held by the response cache.",
+             [({}, responses.size)]),
+        ]
+
+    register(collect_stats)
+
+
+def stats_family(name, help_text, stats, label="result"):
+    """
+    A function to turn a dict of counters into one metric family
+    with a label per key, for collectors.
+    """
+    return (name, "counter", help_text,
+            [({label: key}, value) for key, value in stats.items()])
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    return "{" + inner + "}"
+
+
+def render():
+    """
+    A function to render every metric in the Prometheus text
+    exposition format (version 0.0.4).
+    """
+    lines = []
+    name = f"{NAMESPACE}_stage_seconds"
+    lines.append(f"# HELP {name} Time spent in each stage of a request.")
+    lines.append(f"# TYPE {name} histogram")
+    for stage, histogram in sorted(stages.items()):
+        with histogram.lock:
+            counts = list(histogram.counts)
+            total = histogram.total
+        cumulative = 0
+        for bound, times in zip(histogram.buckets + ("+Inf",), counts):
+            cumulative += times
+            lines.append(f'{name}_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{stage="{stage}"}} {total}')
+        lines.append(f'{name}_count{{stage="{stage}"}} {cumulative}')
+
+    with lock:
+        snapshot = sorted(counters.items())
+    families = {}
+    for (counter, label, value), amount in snapshot:
+        families.setdefault(counter, []).append(({label: value}, amount))
+    family_list = [(counter, "counter", "", samples)
+                   for counter, samples in families.items()]
+    for collector in collectors:
+        family_list.extend(collector())
+
+    for family, kind, help_text, samples in family_list:
+        family = f"{NAMESPACE}_{family}"
+        if help_text:
+            lines.append(f"# HELP {family} {help_text}")
+        lines.append(f"# TYPE {family} {kind}")
+        for labels, value in samples:
+            lines.append(f"{family}{format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,282 @@
+"""
+A client for the Numbers API (http://numbersapi.com).
+All requests go through one pooled requests.Session, so
+connections to the API are kept alive and reused. Every
+call is bounded by connect and read timeouts, retried a
+limited number of times with jittered backoff, and never
+runs past an overall deadline. AsyncNumbersAPIClient
+does the same for asyncio on top of aiohttp.
+"""
+from os import environ
+from time import monotonic, sleep
+import asyncio
+import random
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+import digits
+import metrics
+
+NUMBERS_API_URL = environ.get("NUMBERS_API_URL", "http://numbersapi.com")
+
+# Timeouts in seconds for opening a connection and for each read
+CONNECT_TIMEOUT = float(environ.get("NUMBERS_API_CONNECT_TIMEOUT", 0.5))
+READ_TIMEOUT = float(environ.get("NUMBERS_API_READ_TIMEOUT", 1.0))
+
+# Extra attempts after the first one, and the base backoff between them
+RETRIES = int(environ.get("NUMBERS_API_RETRIES", 2))
+BACKOFF = float(environ.get("NUMBERS_API_BACKOFF", 0.1))
+
+# Overall time in seconds one fun fact lookup may take, retries included
+DEADLINE = float(environ.get("NUMBERS_API_DEADLINE", 2.0))
+
+# Number of keep-alive connections kept open to the API
+POOL_SIZE = int(environ.get("NUMBERS_API_POOL_SIZE", 32))
+
+# Longer numbers are not sent upstream at all
+MAX_DIGITS = int(environ.get("NUMBERS_API_MAX_DIGITS", 100))
+TOO_LARGE = "number is too large for the Numbers API"
+
+
+class NumbersAPIError(Exception):
+    """
+    Raised when a fun fact could not be retrieved.
+    """
+
+
+class NotAsked(NumbersAPIError):
+    """
+    Raised when the API was not called at all, so the failure
+    says nothing about the API itself and must not be cached.
+    """
+
+
+class DeadlineExceeded(NotAsked):
+    """
+    Raised when the caller's deadline passed before the API was
+    called.
+    """
+
+
+class TooLarge(NotAsked):
+    """
+    Raised for numbers too long to send to the API.
+    """
+
+
+def count_error(kind):
+    """
+    A function to count a failed upstream attempt by kind:
+    "timeout", "connection", "server" (5xx) or "client".
+    """
+    metrics.count("upstream_errors_total", "kind", kind)
+
+
+def too_large(number):
+    """
+    A function to check if a number is too long to send upstream.
+    """
+    return digits.digit_count(number) > MAX_DIGITS
+
+
+def check_size(number):
+    """
+    A function to refuse numbers too long to send upstream.
+    """
+    if too_large(number):
+        raise TooLarge(TOO_LARGE)
+
+
+class NumbersAPIClient:
+    """
+    A pooled, timeout-bounded client for the Numbers API.
+    """
+
+    def __init__(self, base_url=NUMBERS_API_URL,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF, deadline=DEADLINE,
+                 pool_size=POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.deadline = deadline
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size,
+                              max_retries=0)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fact_url(self, number):
+        """
+        A function to build the math fact URL for a number.
+        """
+        return f"{self.base_url}/{number}/math?json"
+
+    def get_json(self, url, deadline=None):
+        """
+        A function to GET a URL and return the decoded JSON body.
+        deadline is an absolute time.monotonic() value; it
+        defaults to now plus the client's deadline.
+        """
+        if deadline is None:
+            deadline = monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                if attempt == 0:
+                    raise DeadlineExceeded("deadline exceeded")
+                raise error
+            timeout = (min(self.connect_timeout, remaining),
+                       min(self.read_timeout, remaining))
+            try:
+                response = self.session.get(url, timeout=timeout)
+                if response.status_code < 500:
+                    response.raise_for_status()
+                    return response.json()
+                error = NumbersAPIError(f"upstream returned {response.status_code}")
+                count_error("server")
+            except requests.Timeout as e:
+                error = NumbersAPIError(str(e))
+                count_error("timeout")
+            except requests.ConnectionError as e:
+                error = NumbersAPIError(str(e))
+                count_error("connection")
+            except (requests.RequestException, ValueError) as e:
+                # Client errors and bad JSON will not improve on retry
+                count_error("client")
+                raise NumbersAPIError(str(e)) from e
+
+            if attempt >= self.retries:
+                raise error
+            # Full jitter: sleep a random time up to the exponential backoff
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            if monotonic() + delay >= deadline:
+                raise error
+            sleep(delay)
+            attempt += 1
+
+    def get_fact(self, number, deadline=None):
+        """
+        A function to fetch the math fun fact for a number.
+        """
+        check_size(number)
+        data = self.get_json(self.fact_url(number), deadline)
+        return data.get("text", "")
+
+    def get_facts(self, numbers, deadline=None):
+        """
+        A function to fetch the math fun facts for several numbers
+        with the API's batch syntax (/1,2,3/math), returning a dict
+        mapping each number to its fact.
+        """
+        # Numbers too long for the API are left out, so they get no fact
+        numbers = [number for number in numbers if not too_large(number)]
+        if not numbers:
+            return {}
+        spec = ",".join(str(number) for number in numbers)
+        data = self.get_json(self.fact_url(spec), deadline)
+        if len(numbers) == 1:
+            # A batch of one comes back in the single-number format
+            return {numbers[0]: data.get("text", "")}
+        facts = {}
+        for key, value in data.items():
+            facts[int(key)] = value.get("text", "") if isinstance(value, dict) else value
+        return facts
+
+    def close(self):
+        """
+        A function to close the pooled connections.
+        """
+        self.session.close()
+
+
+class AsyncNumbersAPIClient:
+    """
+    The asyncio counterpart of NumbersAPIClient, built on one
+    long-lived aiohttp.ClientSession with the same timeouts,
+    retry budget and deadline. It must be created inside a
+    running event loop.
+    """
+
+    def __init__(self, base_url=NUMBERS_API_URL,
+                 connect_timeout=CONNECT_TIMEOUT, read_timeout=READ_TIMEOUT,
+                 retries=RETRIES, backoff=BACKOFF, deadline=DEADLINE,
+                 pool_size=POOL_SIZE):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.deadline = deadline
+        self.session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=pool_size))
+
+    def fact_url(self, number):
+        """
+        A function to build the math fact URL for a number.
+        """
+        return f"{self.base_url}/{number}/math?json"
+
+    async def get_json(self, url, deadline=None):
+        """
+        A function to GET a URL and return the decoded JSON body.
+        deadline is an absolute time.monotonic() value; it
+        defaults to now plus the client's deadline.
+        """
+        if deadline is None:
+            deadline = monotonic() + self.deadline
+        attempt = 0
+        while True:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                if attempt == 0:
+                    raise DeadlineExceeded("deadline exceeded")
+                raise error
+            # Waiting for a free pooled connection counts against the total
+            timeout = aiohttp.ClientTimeout(
+                total=remaining,
+                sock_connect=min(self.connect_timeout, remaining),
+                sock_read=min(self.read_timeout, remaining))
+            try:
+                async with self.session.get(url, timeout=timeout) as response:
+                    if response.status < 500:
+                        response.raise_for_status()
+                        return await response.json(content_type=None)
+                    error = NumbersAPIError(f"upstream returned {response.status}")
+                    count_error("server")
+            except asyncio.TimeoutError as e:
+                error = NumbersAPIError(str(e) or type(e).__name__)
+                count_error("timeout")
+            except aiohttp.ClientConnectionError as e:
+                error = NumbersAPIError(str(e) or type(e).__name__)
+                count_error("connection")
+            except (aiohttp.ClientError, ValueError) as e:
+                # Client errors and bad JSON will not improve on retry
+                count_error("client")
+                raise NumbersAPIError(str(e)) from e
+
+            if attempt >= self.retries:
+                raise error
+            # Full jitter: sleep a random time up to the exponential backoff
+            delay = random.uniform(0, self.backoff * 2 ** attempt)
+            if monotonic() + delay >= deadline:
+                raise error
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_fact(self, number, deadline=None):
+        """
+        A function to fetch the math fun fact for a number.
+        """
+        check_size(number)
+        data = await self.get_json(self.fact_url(number), deadline)
+        return data.get("text", "")
+
+    async def close(self):
+        """
+        A function to close the pooled connections.
+        """
+        await self.session.close()
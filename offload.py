@@ -0,0 +1,259 @@
+"""
+A process pool for classifying large numbers.
+Primality and factoring are pure Python and hold the GIL, so a
+heavy number classified on one server thread slows every other
+request in the process. Numbers with at least OFFLOAD_DIGITS
+digits are classified in a pool of worker processes instead,
+and smaller numbers stay inline where they are cheaper than the
+round trip. The workers are started with the lookup tables
+already built, and the pool keeps queue depth and latency
+counters for /api/stats.
+"""
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from os import cpu_count, environ, getpid
+from threading import Lock
+from time import monotonic
+import budget
+import classifier
+import digits
+import metrics
+
+# Worker processes; 0 classifies everything inline
+CLASSIFY_PROCESSES = int(environ.get("CLASSIFY_PROCESSES", cpu_count() or 1))
+
+# Numbers with at least this many digits go to the pool
+OFFLOAD_DIGITS = int(environ.get("CLASSIFY_OFFLOAD_DIGITS", 20))
+OFFLOAD_LIMIT = 10 ** (OFFLOAD_DIGITS - 1)
+
+# Seconds the caller keeps waiting past the budget for the partial
+# result of a worker whose checks ran out of budget
+OFFLOAD_GRACE = float(environ.get("CLASSIFY_OFFLOAD_GRACE", 0.25))
+
+pool = None
+pool_pid = None
+pool_lock = Lock()
+stats = {"inline": 0, "offloaded": 0, "queued": 0, "max_queued": 0,
+         "latency_total": 0.0, "latency_max": 0.0, "compute_total": 0.0,
+         "timed_out": 0, "restarts": 0}
+
+
+def warm():
+    """
+    A function run once in every worker to build the lookup
+    tables before the first number arrives.
+    """
+    digits.limb_tables(10).histograms
+    classifier.classify(2 ** 61 - 1)
+
+
+def work(number, end):
+    """
+    A function run in a worker to classify a number by the
+    caller's deadline end, a monotonic() time; the monotonic
+    clock is shared by every process on the machine, so time
+    spent in the queue counts against the budget. It also
+    returns the time spent, so the queue wait can be told apart.
+    """
+    start = monotonic()
+    with budget.limit(max(end - start, 0)):
+        data = classifier.classify(number)
+    return data, monotonic() - start
+
+
+def start():
+    """
+    A function to start the pool and its warm workers, once
+    per process. A forked server worker starts its own pool.
+    """
+    global pool, pool_pid
+    if CLASSIFY_PROCESSES < 1:
+        return None
+    with pool_lock:
+        if pool is not None and pool_pid == getpid():
+            return pool
+        pool = ProcessPoolExecutor(max_workers=CLASSIFY_PROCESSES,
+                                   initializer=warm)
+        pool_pid = getpid()
+    # The first task launches every worker
+    pool.submit(int, 0).result()
+    return pool
+
+
+def discard(broken):
+    """
+    A function to drop a pool whose worker died, so the next
+    start() replaces it instead of failing forever.
+    """
+    global pool, pool_pid
+    with pool_lock:
+        if pool is not broken:
+            return
+        pool, pool_pid = None, None
+        stats["restarts"] += 1
+    broken.shutdown(wait=False)
+
+
+def stop():
+    """
+    A function to shut this process's pool down, such as in a
+    server's master process before it forks its workers, which
+    then start pools of their own.
+    """
+    global pool, pool_pid
+    with pool_lock:
+        if pool is None or pool_pid != getpid():
+            return
+        stopping, pool, pool_pid = pool, None, None
+    stopping.shutdown(wait=True)
+
+
+def wants(number):
+    """
+    A function to check if a number is big enough to offload.
+    """
+    return CLASSIFY_PROCESSES > 0 and abs(number) >= OFFLOAD_LIMIT
+
+
+def remaining_budget():
+    """
+    A function to return the deadline of the current budget,
+    or of a new one if none is running.
+    """
+    end = budget.deadline.get()
+    return monotonic() + budget.COMPUTE_BUDGET if end is None else end
+
+
+def wait_timeout(end):
+    """
+    A function to return how long to wait for a job whose budget
+    ends at end. The worker stops its checks at end and then still
+    has to send its partial result back, so the wait runs a grace
+    period longer; otherwise the caller would give up first and
+    lose the checks that did finish.
+    """
+    return max(end - monotonic(), 0) + OFFLOAD_GRACE
+
+
+def submit(number, end=None):
+    """
+    A function to classify a number in the pool, returning a
+    concurrent.futures.Future for the classification. end is
+    the monotonic() deadline, by default that of the current
+    budget. Cancelling the future drops the job if no worker
+    has picked it up yet.
+    """
+    if end is None:
+        end = remaining_budget()
+    current = start()
+    try:
+        future = current.submit(work, number, end)
+    except BrokenProcessPool:
+        # A worker died since the last job; start a fresh pool
+        discard(current)
+        current = start()
+        future = current.submit(work, number, end)
+    submitted = monotonic()
+    with pool_lock:
+        stats["offloaded"] += 1
+        stats["queued"] += 1
+        stats["max_queued"] = max(stats["max_queued"], stats["queued"])
+    result = Future()
+    result.add_done_callback(lambda result: result.cancelled() and future.cancel())
+
+    def done(future):
+        latency = monotonic() - submitted
+        with pool_lock:
+            stats["queued"] -= 1
+            stats["latency_total"] += latency
+            stats["latency_max"] = max(stats["latency_max"], latency)
+        if result.done():
+            # The caller gave up waiting
+            return
+        try:
+            data, spent = future.result()
+        except BrokenProcessPool as e:
+            discard(current)
+            result.set_exception(e)
+            return
+        except BaseException as e:
+            result.set_exception(e)
+            return
+        with pool_lock:
+            stats["compute_total"] += spent
+        budget.count_exceeded(len(data.get("timeouts", ())))
+        result.set_result(data)
+
+    future.add_done_callback(done)
+    return result
+
+
+def timed_out(number):
+    """
+    A function to give up on a number whose budget ran out
+    while it waited in the pool, reporting the budgeted checks
+    as timed out.
+    """
+    with pool_lock:
+        stats["timed_out"] += 1
+    data = classifier.timed_out(number)
+    budget.count_exceeded(len(data["timeouts"]))
+    return data
+
+
+def classify(number):
+    """
+    A function to classify a number, in the pool if it is
+    big enough and inline otherwise. The wait for the pool
+    ends a grace period after the current budget.
+    """
+    if wants(number):
+        end = remaining_budget()
+        try:
+            result = submit(number, end)
+        except BrokenProcessPool:
+            # The fresh pool failed to start too
+            result = None
+        if result is not None:
+            try:
+                return result.result(timeout=wait_timeout(end))
+            except TimeoutError:
+                result.cancel()
+                return timed_out(number)
+            except BrokenProcessPool:
+                # The worker died under this job; classify it here
+                pass
+    with pool_lock:
+        stats["inline"] += 1
+    return classifier.classify(number)
+
+
+def report():
+    """
+    A function to return the pool settings and counters.
+    """
+    with pool_lock:
+        report = dict(stats, processes=CLASSIFY_PROCESSES,
+                      offload_digits=OFFLOAD_DIGITS)
+    offloaded = report["offloaded"] - report["queued"]
+    report["latency_mean"] = report["latency_total"] / offloaded if offloaded else 0.0
+    return report
+
+
+def collect_stats():
+    """
+    A function to report the queue depth and where numbers
+    were classified to /metrics.
+    """
+    with pool_lock:
+        queued, inline, offloaded = stats["queued"], stats["inline"], stats["offloaded"]
+    return [
+        ("offload_queue_depth", "gauge",
+         "Numbers waiting for or being classified by the worker processes.",
+         [({}, queued)]),
+        ("offload_total", "counter", "Numbers classified inline or offloaded.",
+         [({"where": "inline"}, inline), ({"where": "offloaded"}, offloaded)]),
+    ]
+
+
+metrics.register(collect_stats)
@@ -0,0 +1,85 @@
+"""
+Parsing of the number query parameter.
+The length of the input is checked before anything else, so
+a huge input is rejected without being parsed. Inputs longer
+than Python's int/str conversion limit are parsed by divide
+and conquer, which is subquadratic with CPython's Karatsuba
+multiplication, instead of by int().
+"""
+from functools import lru_cache
+from os import environ
+import re
+import sys
+
+# Longest number (in digits) the API accepts
+MAX_NUMBER_DIGITS = int(environ.get("MAX_NUMBER_DIGITS", 10000))
+
+# Strings up to this many digits are parsed with int() directly
+DIRECT_PARSE_DIGITS = 2000
+
+DECIMAL = re.compile(r"[+-]?[0-9]+")
+
+
+class NumberTooLarge(ValueError):
+    """
+    Raised when an input has more digits than the API accepts.
+    """
+
+
+def allow_long_numbers():
+    """
+    A function to raise Python's int/str conversion limit to
+    MAX_NUMBER_DIGITS, so accepted numbers can be written back
+    out in responses. Inputs are length-checked before they
+    are parsed, which is the protection the limit provides.
+    """
+    if hasattr(sys, "set_int_max_str_digits"):
+        current = sys.get_int_max_str_digits()
+        if current and current < MAX_NUMBER_DIGITS + 1:
+            sys.set_int_max_str_digits(MAX_NUMBER_DIGITS + 1)
+
+
+@lru_cache(maxsize=64)
+def power_of_ten(exponent):
+    """
+    A function to return 10 ** exponent, cached for reuse.
+    """
+    return 10 ** exponent
+
+
+def parse_decimal(digits):
+    """
+    A function to parse a string of decimal digits by splitting
+    it in half, parsing both halves, and joining them with
+    one multiplication.
+    """
+    if len(digits) <= DIRECT_PARSE_DIGITS:
+        return int(digits)
+    # Split so the low half has a power-of-two length, which keeps
+    # the cached powers of ten few
+    low_length = 1 << ((len(digits) - 1).bit_length() - 1)
+    high = parse_decimal(digits[:-low_length])
+    low = parse_decimal(digits[-low_length:])
+    return high * power_of_ten(low_length) + low
+
+
+def parse_number(text):
+    """
+    A function to parse the number parameter. It raises
+    NumberTooLarge for inputs over MAX_NUMBER_DIGITS digits
+    and ValueError for anything that is not an optionally
+    signed string of ASCII decimal digits.
+    """
+    text = text.strip()
+    # The digits are counted, without the sign, before any parsing
+    signed = text[:1] in ("+", "-")
+    if len(text) - signed > MAX_NUMBER_DIGITS:
+        raise NumberTooLarge(f"number has more than {MAX_NUMBER_DIGITS} digits")
+    # One grammar for every length: int() alone would also take
+    # underscores and non-ASCII digits
+    if not DECIMAL.fullmatch(text):
+        raise ValueError(f"invalid integer: {text[:20]}")
+    if len(text) <= DIRECT_PARSE_DIGITS:
+        return int(text)
+    sign = -1 if text[0] == "-" else 1
+    return sign * parse_decimal(text.lstrip("+-"))
@@ -0,0 +1,167 @@
+"""
+Primality testing for the Number Classification API.
+Numbers are first checked against a table of small primes,
+then with a deterministic Miller-Rabin test for 64-bit
+inputs, and with the Baillie-PSW test (a strong probable
+prime test to base 2 plus a strong Lucas test) above that.
+"""
+from math import isqrt
+import budget
+
+# Numbers below this bound are checked by trial division alone
+SIEVE_LIMIT = 1000
+
+# Miller-Rabin with these witnesses is exact for every n < 2^64
+MR_WITNESSES_64 = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+
+UINT64_LIMIT = 1 << 64
+
+# Modular powers of numbers above this many bits are computed in
+# slices, checking the compute budget between slices
+SLICED_POW_BITS = 2048
+POW_SLICE_BITS = 64
+
+
+def small_primes(limit):
+    """
+    A function to list the primes below limit
+    using the sieve of Eratosthenes.
+    """
+    if limit < 3:
+        return []
+    sieve = bytearray([1]) * limit
+    sieve[0] = sieve[1] = 0
+    for i in range(2, isqrt(limit - 1) + 1):
+        if sieve[i]:
+            sieve[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i, flag in enumerate(sieve) if flag]
+
+
+SMALL_PRIMES = tuple(small_primes(SIEVE_LIMIT))
+
+
+def powmod(a, e, n):
+    """
+    A function to compute a ** e % n. For large n the exponent
+    is processed a slice of bits at a time, so the compute
+    budget can stop the calculation part of the way through.
+    """
+    if n.bit_length() <= SLICED_POW_BITS:
+        return pow(a, e, n)
+    result = 1
+    shift = e.bit_length() - e.bit_length() % POW_SLICE_BITS
+    mask = (1 << POW_SLICE_BITS) - 1
+    while shift >= 0:
+        budget.check()
+        result = pow(result, 1 << POW_SLICE_BITS, n) * pow(a, (e >> shift) & mask, n) % n
+        shift -= POW_SLICE_BITS
+    return result
+
+
+def is_strong_probable_prime(n, a):
+    """
+    A function to check if an odd number n > 2
+    is a strong probable prime to base a.
+    """
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    x = powmod(a, d, n)
+    if x == 1 or x == n - 1:
+        return True
+    for i in range(s - 1):
+        if i % POW_SLICE_BITS == 0:
+            budget.check()
+        x = x * x % n
+        if x == n - 1:
+            return True
+    return False
+
+
+def jacobi(a, n):
+    """
+    A function to compute the Jacobi symbol (a/n)
+    for an odd positive n.
+    """
+    a %= n
+    result = 1
+    while a:
+        while a % 2 == 0:
+            a //= 2
+            if n % 8 in (3, 5):
+                result = -result
+        a, n = n, a
+        if a % 4 == 3 and n % 4 == 3:
+            result = -result
+        a %= n
+    return result if n == 1 else 0
+
+
+def is_strong_lucas_probable_prime(n):
+    """
+    A function to check if an odd number n is a strong
+    Lucas probable prime, choosing the parameters with
+    Selfridge's method A.
+    """
+    # n must not be a perfect square, or no suitable D exists
+    if isqrt(n) ** 2 == n:
+        return False
+    d = 5
+    while True:
+        j = jacobi(d, n)
+        if j == -1:
+            break
+        if j == 0 and abs(d) != n:
+            return False
+        d = -d - 2 if d > 0 else -d + 2
+    p = 1
+    q = (1 - d) // 4
+
+    # Write n + 1 = k * 2^s with k odd
+    k = n + 1
+    s = 0
+    while k % 2 == 0:
+        k //= 2
+        s += 1
+
+    # Compute U_k, V_k and Q^k by walking the bits of k
+    u, v, qk = 1, p, q % n
+    inv2 = (n + 1) // 2
+    for i, bit in enumerate(bin(k)[3:]):
+        if i % POW_SLICE_BITS == 0:
+            budget.check()
+        u, v = u * v % n, (v * v - 2 * qk) % n
+        qk = qk * qk % n
+        if bit == "1":
+            u, v = (p * u + v) * inv2 % n, (d * u + p * v) * inv2 % n
+            qk = qk * q % n
+
+    if u == 0 or v == 0:
+        return True
+    for i in range(s - 1):
+        if i % POW_SLICE_BITS == 0:
+            budget.check()
+        v = (v * v - 2 * qk) % n
+        if v == 0:
+            return True
+        qk = qk * qk % n
+    return False
+
+
+def is_prime(n):
+    """
+    A function to check if a number is prime.
+    """
+    if n < 2:
+        return False
+    for p in SMALL_PRIMES:
+        if n % p == 0:
+            return n == p
+    if n < SIEVE_LIMIT * SIEVE_LIMIT:
+        # No prime factor below sqrt(n), so n is prime
+        return True
+    if n < UINT64_LIMIT:
+        return all(is_strong_probable_prime(n, a) for a in MR_WITNESSES_64)
+    return is_strong_probable_prime(n, 2) and is_strong_lucas_probable_prime(n)
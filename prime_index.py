@@ -0,0 +1,255 @@
+"""
+A compressed index of the primes below a limit.
+Every prime above 5 is 1, 7, 11, 13, 17, 19, 23 or 29 more than
+a multiple of 30, so each block of 30 numbers fits in one byte
+with a bit per candidate. A running count of the primes before
+every 64-byte superblock turns prime counting into one lookup
+plus a popcount, and the k-th prime into a binary search over
+those counts. The numbers below 10^8 take about 3.75 MB: 3.33 MB
+of bits and 0.42 MB of counts.
+
+The index is built with the segmented sieve at startup, or
+loaded from PRIME_INDEX_PATH if that file exists. Build the
+file with:
+    python prime_index.py build [limit]
+"""
+from math import isqrt
+from os import environ, replace
+import mmap
+import struct
+import sys
+import numpy as np
+import primality
+import sieve
+
+# Numbers below this are indexed (rounded up to a multiple of 30)
+PRIME_INDEX_LIMIT = int(environ.get("PRIME_INDEX_LIMIT", 10 ** 7))
+
+# File to load the index from, if it exists
+PRIME_INDEX_PATH = environ.get("PRIME_INDEX_PATH", "prime_index.bin")
+
+# The candidates in each block of 30, one bit each
+RESIDUES = (1, 7, 11, 13, 17, 19, 23, 29)
+WHEEL_PRIMES = (2, 3, 5)
+
+# Bit of each residue, and the bits for residues up to each offset
+BIT = {r: i for i, r in enumerate(RESIDUES)}
+MASK_UPTO = [sum(1 << i for i, r in enumerate(RESIDUES) if r <= offset)
+             for offset in range(30)]
+
+# Bytes per superblock with a stored running count
+SUPERBLOCK = 64
+
+# Blocks sieved at a time while building
+BUILD_BLOCKS = 1 << 16
+
+MAGIC = b"NPI1"
+HEADER = struct.Struct("<4sQ")
+
+
+class PrimeIndex:
+    """
+    The primes below limit, one bit per wheel-30 candidate.
+    """
+
+    def __init__(self, bits, limit):
+        self.bits = bits
+        self.limit = limit
+        # counts[i] is the number of indexed primes before superblock i
+        sizes = np.frombuffer(bits, dtype=np.uint8)
+        popcounts = np.unpackbits(sizes).reshape(-1, 8).sum(axis=1)
+        padded = np.zeros(-(-len(bits) // SUPERBLOCK) * SUPERBLOCK, dtype=np.int64)
+        padded[:len(bits)] = popcounts
+        self.counts = np.concatenate((
+            [0], np.cumsum(padded.reshape(-1, SUPERBLOCK).sum(axis=1))))
+        self.total = len(WHEEL_PRIMES) + int(self.counts[-1])
+
+    def __contains__(self, n):
+        return 0 <= n < self.limit
+
+    def is_prime(self, n):
+        """
+        A function to check if an indexed number is prime.
+        """
+        if n < 7:
+            return n in WHEEL_PRIMES
+        bit = BIT.get(n % 30)
+        return bit is not None and bool(self.bits[n // 30] >> bit & 1)
+
+    def count(self, n):
+        """
+        A function to count the primes up to and including n.
+        """
+        if n < 7:
+            return sum(1 for p in WHEEL_PRIMES if p <= n)
+        block = n // 30
+        superblock = block // SUPERBLOCK
+        before = int.from_bytes(
+            self.bits[superblock * SUPERBLOCK:block], "little").bit_count()
+        within = (self.bits[block] & MASK_UPTO[n % 30]).bit_count()
+        return len(WHEEL_PRIMES) + int(self.counts[superblock]) + before + within
+
+    def select(self, k):
+        """
+        A function to return the k-th prime (the first is 2),
+        or None if it is beyond the index.
+        """
+        if k < 1 or k > self.total:
+            return None
+        if k <= len(WHEEL_PRIMES):
+            return WHEEL_PRIMES[k - 1]
+        k -= len(WHEEL_PRIMES)
+        superblock = int(np.searchsorted(self.counts, k)) - 1
+        k -= int(self.counts[superblock])
+        block = superblock * SUPERBLOCK
+        while True:
+            found = self.bits[block].bit_count()
+            if k <= found:
+                break
+            k -= found
+            block += 1
+        byte = self.bits[block]
+        for bit, residue in enumerate(RESIDUES):
+            if byte >> bit & 1:
+                k -= 1
+                if k == 0:
+                    return block * 30 + residue
+
+    def next_prime(self, n):
+        """
+        A function to return the smallest prime above n, or
+        None if it is beyond the index.
+        """
+        if n < 5:
+            return next(p for p in WHEEL_PRIMES + (7,) if p > n)
+        block, offset = divmod(n + 1, 30)
+        if block >= len(self.bits):
+            return None
+        # Drop the candidates below n + 1 in its own block
+        byte = self.bits[block] & ~(MASK_UPTO[offset - 1] if offset else 0)
+        while True:
+            if byte:
+                low = (byte & -byte).bit_length() - 1
+                return block * 30 + RESIDUES[low]
+            block += 1
+            if block >= len(self.bits):
+                return None
+            byte = self.bits[block]
+
+    def previous_prime(self, n):
+        """
+        A function to return the largest prime below n, or None
+        if there is none. n may be at most the limit.
+        """
+        if n <= 7:
+            smaller = [p for p in WHEEL_PRIMES if p < n]
+            return smaller[-1] if smaller else None
+        block = (n - 1) // 30
+        byte = self.bits[block] & MASK_UPTO[(n - 1) % 30]
+        while True:
+            if byte:
+                return block * 30 + RESIDUES[byte.bit_length() - 1]
+            block -= 1
+            if block < 0:
+                return 5
+            byte = self.bits[block]
+
+    def report(self):
+        """
+        A function to return the limit, the prime count and the
+        memory the index uses, in total and per 10^8 numbers.
+        """
+        size = len(self.bits) + self.counts.nbytes
+        return {"limit": self.limit, "primes": self.total, "bytes": size,
+                "bytes_per_1e8": round(size * 10 ** 8 / self.limit)}
+
+
+def build_bits(limit):
+    """
+    A function to sieve the numbers below limit (a multiple
+    of 30) into the wheel bitset.
+    """
+    primes = sieve.base_primes(isqrt(limit) + 1)
+    columns = list(RESIDUES)
+    chunks = []
+    for lo in range(0, limit, 30 * BUILD_BLOCKS):
+        hi = min(lo + 30 * BUILD_BLOCKS, limit)
+        flags = sieve.prime_flags(lo, hi, primes).reshape(-1, 30)[:, columns]
+        chunks.append(np.packbits(flags, axis=1, bitorder="little").tobytes())
+    return b"".join(chunks)
+
+
+def build(limit=PRIME_INDEX_LIMIT):
+    """
+    A function to build the index of the primes below limit.
+    """
+    limit = -(-max(limit, 30) // 30) * 30
+    return PrimeIndex(build_bits(limit), limit)
+
+
+def save(index, path=PRIME_INDEX_PATH):
+    """
+    A function to write an index to a file.
+    """
+    partial = path + ".tmp"
+    with open(partial, "wb") as f:
+        f.write(HEADER.pack(MAGIC, index.limit))
+        f.write(index.bits)
+    replace(partial, path)
+
+
+def load(path=PRIME_INDEX_PATH, limit=PRIME_INDEX_LIMIT):
+    """
+    A function to map the index from path if that file exists,
+    and to build it below limit otherwise.
+    """
+    if path:
+        try:
+            with open(path, "rb") as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            data = None
+        if data is not None:
+            magic, limit = HEADER.unpack_from(data)
+            if magic != MAGIC or len(data) != HEADER.size + limit // 30:
+                raise ValueError(f"{path} is not a prime index")
+            return PrimeIndex(memoryview(data)[HEADER.size:], limit)
+    return build(limit)
+
+
+def next_prime(index, n):
+    """
+    A function to find the smallest prime above n, searching
+    past the end of the index with the primality test.
+    """
+    prime = index.next_prime(n) if n < index.limit else None
+    if prime is not None:
+        return prime
+    n = max(n, index.limit - 1) + 1
+    while not primality.is_prime(n):
+        n += 1
+    return n
+
+
+def previous_prime(index, n):
+    """
+    A function to find the largest prime below n, searching
+    above the index with the primality test.
+    """
+    if n <= index.limit:
+        return index.previous_prime(n)
+    n -= 1
+    while n >= index.limit:
+        if primality.is_prime(n):
+            return n
+        n -= 1
+    return index.previous_prime(index.limit)
+
+
+if __name__ == "__main__":
+    if sys.argv[1:2] != ["build"]:
+        sys.exit(__doc__)
+    limit = int(sys.argv[2]) if len(sys.argv) > 2 else PRIME_INDEX_LIMIT
+    index = build(limit)
+    save(index)
+    print(f"wrote {PRIME_INDEX_PATH}: {index.report()}")
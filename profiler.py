@@ -0,0 +1,187 @@
+"""
+An opt-in sampling profiler for slow requests.
+While a profiled request runs, a background thread reads the
+request thread's stack every PROFILE_INTERVAL seconds. If the
+request takes longer than PROFILE_SLOW_MS, its samples are
+written to PROFILE_DIR in the collapsed-stack format that
+flamegraph.pl and speedscope read, one "frame;frame;frame count"
+line per distinct stack. A .json file next to it records the
+number, the total time and the time spent in each stage. Only
+the newest PROFILE_KEEP profiles are kept.
+
+The profiler is off unless PROFILE_SLOW_MS is set, and the app
+only installs its hooks when it is on, so it costs nothing
+otherwise. PROFILE_SAMPLE_RATE profiles just a fraction of the
+requests, to keep the sampling cost down under load.
+"""
+from collections import Counter
+from os import environ, getpid, listdir, makedirs, path, remove
+from random import random
+from threading import Condition, Thread, get_ident
+from time import perf_counter, sleep, time, time_ns
+import json
+import sys
+import metrics
+
+# Requests slower than this many milliseconds are written out
+PROFILE_SLOW_MS = environ.get("PROFILE_SLOW_MS")
+PROFILE_ENABLED = bool(PROFILE_SLOW_MS)
+
+# Fraction of requests to sample
+PROFILE_SAMPLE_RATE = float(environ.get("PROFILE_SAMPLE_RATE", 1.0))
+
+# Seconds between stack samples
+PROFILE_INTERVAL = float(environ.get("PROFILE_INTERVAL", 0.005))
+
+# Directory the profiles are written to, and how many to keep
+PROFILE_DIR = environ.get("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(environ.get("PROFILE_KEEP", 100))
+
+# Longest number kept in a profile's tags
+MAX_TAG_LENGTH = 100
+
+
+class Sampler:
+    """
+    A thread that samples the stacks of the threads being profiled.
+    It sleeps until there is at least one.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.active = {}
+        self.condition = Condition()
+        self.thread = None
+
+    def add(self, ident):
+        """
+        A function to start sampling a thread, returning the
+        counter its stacks are added to.
+        """
+        samples = Counter()
+        with self.condition:
+            if self.thread is None or not self.thread.is_alive():
+                # Started lazily, so forked workers get their own
+                self.thread = Thread(target=self.run, name="profiler", daemon=True)
+                self.thread.start()
+            self.active[ident] = samples
+            self.condition.notify()
+        return samples
+
+    def remove(self, ident):
+        """
+        A function to stop sampling a thread. Its counter is not
+        touched again once this returns.
+        """
+        with self.condition:
+            self.active.pop(ident, None)
+
+    def run(self):
+        while True:
+            # Counted under the lock, so once remove() returns the
+            # thread's samples can be written out safely
+            with self.condition:
+                while not self.active:
+                    self.condition.wait()
+                frames = sys._current_frames()
+                for ident, samples in self.active.items():
+                    frame = frames.get(ident)
+                    if frame is not None:
+                        samples[collapse(frame)] += 1
+                del frames
+            sleep(self.interval)
+
+
+def collapse(frame):
+    """
+    A function to turn a stack into one collapsed-stack line,
+    outermost frame first.
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({path.basename(code.co_filename)}"
+                     f":{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+sampler = Sampler()
+
+
+class Profile:
+    """
+    The samples and stage times of one request.
+    """
+
+    def __init__(self, tags):
+        self.tags = tags
+        self.ident = get_ident()
+        self.times = metrics.start_request()
+        self.samples = sampler.add(self.ident)
+        self.start = perf_counter()
+
+    def finish(self):
+        """
+        A function to stop sampling, and to write the profile
+        out if the request was slow. Returns the file written,
+        or None.
+        """
+        elapsed = perf_counter() - self.start
+        sampler.remove(self.ident)
+        metrics.finish_request(self.times)
+        if elapsed * 1000 < float(PROFILE_SLOW_MS) or not self.samples:
+            return None
+        return write(self, elapsed)
+
+
+def start(tags):
+    """
+    A function to start profiling the current request, or
+    return None if it is not sampled.
+    """
+    if not PROFILE_ENABLED or random() >= PROFILE_SAMPLE_RATE:
+        return None
+    tags = {key: str(value)[:MAX_TAG_LENGTH] for key, value in tags.items()}
+    return Profile(tags)
+
+
+def write(profile, elapsed, directory=PROFILE_DIR, keep=PROFILE_KEEP):
+    """
+    A function to write a profile's collapsed stacks and tags,
+    then drop the oldest profiles beyond keep.
+    """
+    makedirs(directory, exist_ok=True)
+    # Nanosecond names sort in the order the profiles were taken
+    name = path.join(directory, f"{time_ns():020d}-{getpid()}")
+    with open(name + ".folded", "w") as f:
+        for stack, count in profile.samples.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(name + ".json", "w") as f:
+        json.dump({
+            **profile.tags,
+            "time": time(),
+            "elapsed_ms": round(elapsed * 1000, 3),
+            "stages_ms": {stage: round(seconds * 1000, 3)
+                          for stage, seconds in profile.times.stages.items()},
+            "notes": profile.times.notes,
+            "samples": sum(profile.samples.values()),
+            "interval_ms": sampler.interval * 1000,
+        }, f)
+    rotate(directory, keep)
+    return name + ".folded"
+
+
+def rotate(directory, keep):
+    """
+    A function to delete all but the newest keep profiles.
+    """
+    profiles = sorted(name[:-len(".folded")] for name in listdir(directory)
+                      if name.endswith(".folded"))
+    for name in profiles[:-keep] if keep > 0 else profiles:
+        for suffix in (".folded", ".json"):
+            try:
+                remove(path.join(directory, name + suffix))
+            except FileNotFoundError:
+                # Another worker rotated it first
+                pass
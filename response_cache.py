@@ -0,0 +1,135 @@
+"""
+A cache of finished /api/classify-number responses.
+A response is a pure function of the number and its fun fact,
+so the serialized JSON body is kept, keyed on the number in
+normal decimal form, and a hot request is answered without
+classifying or serializing anything. Each body carries a
+strong ETag. The cache is capped by the bytes it holds and
+evicts the least recently used bodies first. A body is dropped
+when the fun fact it contains is stored again, and it expires
+when that fact stops being fresh.
+"""
+from collections import OrderedDict
+from hashlib import blake2b
+from os import environ
+from threading import Lock
+from time import time
+
+# Bytes of response bodies (and keys) kept in memory
+RESPONSE_CACHE_BYTES = int(environ.get("RESPONSE_CACHE_BYTES", 64 * 1024 * 1024))
+
+# Rough bookkeeping cost of one entry, counted against the cap
+ENTRY_OVERHEAD = 200
+
+
+def make_etag(body):
+    """
+    A function to compute the strong ETag of a response body,
+    without the surrounding quotes.
+    """
+    return blake2b(body, digest_size=16).hexdigest()
+
+
+class CachedResponse:
+    """
+    A serialized response body with its ETag, the time() until
+    which it is fresh (None if it must not be stored) and the
+    time() it last changed, if known.
+    """
+    __slots__ = ("body", "etag", "expires_at", "last_modified", "size")
+
+    def __init__(self, key, body, expires_at, last_modified=None):
+        self.body = body
+        self.etag = make_etag(body)
+        self.expires_at = expires_at
+        self.last_modified = last_modified
+        self.size = len(key) + len(body) + ENTRY_OVERHEAD
+
+
+class ResponseCache:
+    """
+    A size-capped LRU of serialized responses.
+    """
+
+    def __init__(self, max_bytes=RESPONSE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.lock = Lock()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0,
+                      "evictions": 0, "invalidations": 0}
+
+    def get(self, key):
+        """
+        A function to return the cached response for a key,
+        or None if there is none or it has expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires_at <= time():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return entry
+
+    def put(self, key, body, expires_at, last_modified=None):
+        """
+        A function to cache a response body until expires_at
+        (a time() value), returning the CachedResponse.
+        Bodies larger than the whole cache are not kept.
+        """
+        entry = CachedResponse(key, body, expires_at, last_modified)
+        if entry.size > self.max_bytes:
+            return entry
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = entry
+            self.size += entry.size
+            self.stats["stores"] += 1
+            while self.size > self.max_bytes:
+                _, evicted = self.entries.popitem(last=False)
+                self.size -= evicted.size
+                self.stats["evictions"] += 1
+        return entry
+
+    def store(self, number, body, data, fun_facts, fun_fact_ok=True):
+        """
+        A function to cache a finished classify-number body for
+        as long as its fun fact stays fresh, returning the
+        CachedResponse. fun_facts is the FunFactCache the fact
+        came from.
+        """
+        key = str(number)
+        entry = fun_facts.cached_fact(number) if fun_fact_ok else None
+        if "timeouts" in data:
+            # Partial results must not be cached anywhere
+            return CachedResponse(key, body, None)
+        if entry is None:
+            # Only cache a missing fun fact until it would be retried
+            return CachedResponse(key, body, time() + fun_facts.negative_ttl)
+        return self.put(key, body, entry.fetched_at + fun_facts.ttl, entry.fetched_at)
+
+    def invalidate(self, key):
+        """
+        A function to drop the cached response for a key.
+        """
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+                self.stats["invalidations"] += 1
+
+    def _drop(self, key):
+        self.size -= self.entries.pop(key).size
+
+    def report(self):
+        """
+        A function to return the counters and the bytes in use.
+        """
+        with self.lock:
+            return dict(self.stats, entries=len(self.entries),
+                        bytes=self.size, max_bytes=self.max_bytes)
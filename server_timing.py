@@ -0,0 +1,87 @@
+"""
+Server-Timing response headers.
+The stage times a request collects through metrics.start_request
+are written as a Server-Timing header, which browser devtools
+show next to the network timings, for example:
+    Server-Timing: parse;dur=0.012, classify;dur=0.310,
+        prime;dur=0.104, fun_fact;dur=81.200;desc="miss",
+        serialize;dur=0.090, total;dur=82.050
+Durations are in milliseconds; notes such as whether the fun
+fact came from the cache are sent as desc.
+
+The header shows how long each part of a request took, so it
+is off by default. SERVER_TIMING=1 sends it on every response;
+otherwise, if SERVER_TIMING_TOKEN is set, only requests whose
+X-Server-Timing header holds that token get it. A response with
+the header is marked private, so shared caches never replay one
+client's timings to another.
+"""
+from hmac import compare_digest
+from os import environ
+
+SERVER_TIMING = environ.get("SERVER_TIMING", "0").lower() in ("1", "true", "yes")
+
+# Lets trusted clients ask for the header when it is not on for all
+SERVER_TIMING_TOKEN = environ.get("SERVER_TIMING_TOKEN", "")
+
+# Request header a trusted client sends the token in
+TOKEN_HEADER = "X-Server-Timing"
+
+# Whether any request can get the header
+SERVER_TIMING_ENABLED = SERVER_TIMING or bool(SERVER_TIMING_TOKEN)
+
+
+def wanted(headers):
+    """
+    A function to check if a request should get the header.
+    """
+    if SERVER_TIMING:
+        return True
+    if not SERVER_TIMING_TOKEN:
+        return False
+    token = headers.get(TOKEN_HEADER)
+    return token is not None and compare_digest(token.encode(),
+                                                SERVER_TIMING_TOKEN.encode())
+
+
+def private(cache_control):
+    """
+    A function to make a Cache-Control value private, keeping
+    its lifetime for the client's own cache.
+    """
+    if not cache_control:
+        return "private"
+    directives = [d.strip() for d in cache_control.split(",")]
+    if "no-store" in directives:
+        return cache_control
+    kept = [d for d in directives
+            if d != "public" and not d.startswith("s-maxage")]
+    return ", ".join(["private"] + kept)
+
+
+def add(headers, times):
+    """
+    A function to add the Server-Timing header to a response's
+    headers, marking the response private.
+    """
+    headers["Server-Timing"] = header(times)
+    headers["Cache-Control"] = private(headers.get("Cache-Control"))
+
+
+def header(times):
+    """
+    A function to format a request's stage times as the value
+    of a Server-Timing header, ending with the total.
+    """
+    entries = []
+    for stage, seconds in times.stages.items():
+        entry = f"{stage};dur={seconds * 1000:.3f}"
+        if stage in times.notes:
+            entry += f';desc="{times.notes[stage]}"'
+        entries.append(entry)
+    for stage, text in times.notes.items():
+        # Notes for stages that were not timed, such as a cache hit
+        if stage not in times.stages:
+            entries.append(f'{stage};desc="{text}"')
+    entries.append(f"total;dur={times.elapsed() * 1000:.3f}")
+    return ", ".join(entries)
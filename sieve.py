@@ -0,0 +1,152 @@
+"""
+Range classification with sieves.
+A block of consecutive numbers is classified one segment at
+a time: a segmented sieve of Eratosthenes marks the primes,
+a multiplicative sieve computes every divisor sum, the digit
+sums are worked out digit by digit over the whole segment
+with numpy, and Armstrong numbers come from their table.
+Memory stays bounded by the segment size however long the
+range is.
+"""
+from math import isqrt
+import numpy as np
+import armstrong
+
+# Numbers classified per segment
+SEGMENT_SIZE = 1 << 16
+
+# Largest number the sieves handle; int64 divisor sums stay exact below it
+SIEVE_MAX = 10 ** 12
+
+# The base-10 Armstrong numbers the sieves can meet
+ARMSTRONG_ARRAY = np.array(
+    sorted(n for n in armstrong.ARMSTRONG_NUMBERS if n <= SIEVE_MAX),
+    dtype=np.int64)
+
+
+def base_primes(limit):
+    """
+    A function to return the primes up to limit as a numpy array.
+    """
+    if limit < 2:
+        return np.zeros(0, dtype=np.int64)
+    flags = np.ones(limit + 1, dtype=bool)
+    flags[:2] = False
+    for i in range(2, isqrt(limit) + 1):
+        if flags[i]:
+            flags[i * i::i] = False
+    return np.flatnonzero(flags).astype(np.int64)
+
+
+def prime_flags(lo, hi, primes):
+    """
+    A function to mark the primes in [lo, hi), given every
+    prime up to sqrt(hi).
+    """
+    flags = np.ones(hi - lo, dtype=bool)
+    flags[:max(0, min(2, hi) - lo)] = False
+    for p in primes:
+        p = int(p)
+        if p * p >= hi:
+            break
+        # Start at the first multiple of p in the segment, but not p itself
+        start = max(p * p, -(-lo // p) * p)
+        flags[start - lo::p] = False
+    return flags
+
+
+def divisor_sums(lo, hi, primes):
+    """
+    A function to compute sigma(n), the sum of the divisors,
+    for every n in [lo, hi) with lo >= 1, given every prime
+    up to sqrt(hi).
+    """
+    size = hi - lo
+    rest = np.arange(lo, hi, dtype=np.int64)
+    sigma = np.ones(size, dtype=np.int64)
+    # Scratch space for sigma(p^e) at the multiples of p
+    powers = np.empty(size, dtype=np.int64)
+    for p in primes:
+        p = int(p)
+        if p * p >= hi:
+            break
+        first = (-lo) % p
+        if first >= size:
+            continue
+        pk = p
+        total = 1 + p
+        while pk < hi:
+            offset = (-lo) % pk
+            if offset >= size:
+                break
+            powers[offset::pk] = total
+            rest[offset::pk] //= p
+            pk *= p
+            total += pk
+        sigma[first::p] *= powers[first::p]
+    # Whatever is left above 1 is a single prime factor above sqrt(hi)
+    big = rest > 1
+    sigma[big] *= rest[big] + 1
+    return sigma
+
+
+def digit_sums(values):
+    """
+    A function to compute the digit sums for an array
+    of non-negative numbers.
+    """
+    sums = np.zeros(values.shape, dtype=np.int64)
+    rest = values.copy()
+    while rest.any():
+        sums += rest % 10
+        rest //= 10
+    return sums
+
+
+def classify_segment(lo, hi, primes):
+    """
+    A function to classify every number in [lo, hi), returning
+    the classifications in the shape classifier.classify uses.
+    """
+    values = np.arange(lo, hi, dtype=np.int64)
+    sums = digit_sums(np.abs(values))
+    is_armstrong = np.isin(values, ARMSTRONG_ARRAY)
+
+    prime = np.zeros(hi - lo, dtype=bool)
+    perfect = np.zeros(hi - lo, dtype=bool)
+    start = max(lo, 1)
+    if start < hi:
+        prime[start - lo:] = prime_flags(start, hi, primes)
+        perfect[start - lo:] = divisor_sums(start, hi, primes) == 2 * values[start - lo:]
+        perfect[values == 1] = False
+
+    results = []
+    for n, prime_n, perfect_n, armstrong_n, digit_sum in zip(
+            values.tolist(), prime.tolist(), perfect.tolist(),
+            is_armstrong.tolist(), sums.tolist()):
+        properties = ["armstrong"] if armstrong_n else []
+        properties.append("odd" if n % 2 else "even")
+        results.append({
+            "number": n,
+            "is_prime": prime_n,
+            "is_perfect": perfect_n,
+            "properties": properties,
+            "digit_sum": digit_sum,
+        })
+    return results
+
+
+def classify_range(start, end, segment_size=SEGMENT_SIZE):
+    """
+    A function to classify every number from start to end
+    inclusive, yielding the classifications one segment
+    (a list) at a time. end must not exceed SIEVE_MAX.
+    """
+    if end > SIEVE_MAX or start < -SIEVE_MAX:
+        raise ValueError(f"range must lie within +/-{SIEVE_MAX}")
+    primes = base_primes(isqrt(max(end, 0)) + 1)
+    lo = start
+    while lo <= end:
+        hi = min(lo + segment_size, end + 1)
+        yield classify_segment(lo, hi, primes)
+        lo = hi
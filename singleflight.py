@@ -0,0 +1,92 @@
+"""
+Request coalescing ("single-flight") for duplicate work.
+When several callers ask for the same key at once, only the
+first one runs the call; the others wait for it and share
+its result or its exception. SingleFlight is for threads,
+AsyncSingleFlight is for asyncio tasks.
+"""
+from threading import Event, Lock
+import asyncio
+
+
+class Call:
+    """
+    One in-flight call and the result its waiters will share.
+    """
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key across threads.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.calls = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    def do(self, key, fn, timeout=None):
+        """
+        A function to run fn() unless a call for key is already
+        in flight, in which case its outcome is shared instead.
+        Waiting callers give up with TimeoutError after timeout
+        seconds; the call itself keeps running for the others.
+        """
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = Call()
+                self.stats["calls"] += 1
+            else:
+                self.stats["shared"] += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError(f"timed out waiting for {key!r}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    """
+    Coalesces concurrent calls with the same key across asyncio tasks.
+    """
+
+    def __init__(self):
+        self.calls = {}
+        self.stats = {"calls": 0, "shared": 0}
+
+    async def do(self, key, fn):
+        """
+        A function to await fn() unless a call for key is already
+        in flight, in which case its outcome is shared instead.
+        Cancelling one waiter does not cancel the shared call.
+        """
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self.calls[key] = task
+            task.add_done_callback(lambda _: self.calls.pop(key, None))
+            self.stats["calls"] += 1
+        else:
+            self.stats["shared"] += 1
+        return await asyncio.shield(task)
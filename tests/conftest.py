@@ -0,0 +1,13 @@
+"""
+Lets the tests import the app's modules from the repository root,
+and sets them up before any test imports them: fun facts are kept
+in memory only, and numbers are classified inline unless a test
+starts the worker processes itself.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("FUN_FACT_CACHE_PATH", "")
+os.environ.setdefault("CLASSIFY_PROCESSES", "0")
@@ -0,0 +1,33 @@
+"""
+Checks the precomputed table of base-10 Armstrong numbers:
+every entry is a sum of the powers of its own digits, the table
+has all 89 of them, and it agrees with the generator for every
+length up to GENERATED_DIGITS.
+"""
+import pytest
+import armstrong
+
+# Lengths checked against the generator; the app checks up to 6
+GENERATED_DIGITS = 12
+
+
+def power_sum(n):
+    text = str(n)
+    return sum(int(digit) ** len(text) for digit in text)
+
+
+def test_table_has_every_armstrong_number():
+    assert len(armstrong.ARMSTRONG_NUMBERS) == 89
+    # The longest Armstrong number has 39 digits
+    assert max(len(str(n)) for n in armstrong.ARMSTRONG_NUMBERS) == 39
+
+
+@pytest.mark.parametrize("n", sorted(armstrong.ARMSTRONG_NUMBERS))
+def test_entry_is_its_digit_power_sum(n):
+    assert n >= 0
+    assert power_sum(n) == n
+    assert armstrong.is_armstrong(n)
+
+
+def test_table_matches_generator():
+    armstrong.verify_table(GENERATED_DIGITS)
@@ -0,0 +1,122 @@
+"""
+Checks which fun fact lookups the cache remembers: failures of
+the Numbers API are cached, but lookups that never reached it,
+such as numbers too long to send, are not. Also checks that the
+asyncio path coalesces misses and backs off failed refreshes as
+the threaded one does.
+"""
+import asyncio
+import pytest
+import numbers_api
+from fun_fact_cache import FunFactCache
+
+HUGE = 10 ** (numbers_api.MAX_DIGITS + 50)
+
+
+class Upstream:
+    """
+    A fake Numbers API that counts the numbers it is asked for.
+    """
+
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.asked = []
+
+    def fetch(self, number, deadline=None):
+        numbers_api.check_size(number)
+        return self.fetch_many([number], deadline)[number]
+
+    def fetch_many(self, numbers, deadline=None):
+        numbers = [n for n in numbers if not numbers_api.too_large(n)]
+        self.asked.extend(numbers)
+        if self.fail:
+            raise numbers_api.NumbersAPIError("upstream returned 503")
+        return {n: f"{n} is a number." for n in numbers}
+
+    async def async_fetch(self, number, deadline=None):
+        await asyncio.sleep(0.01)
+        return self.fetch(number, deadline)
+
+
+@pytest.fixture
+def upstream():
+    return Upstream()
+
+
+@pytest.fixture
+def cache(tmp_path, upstream):
+    cache = FunFactCache(upstream.fetch, upstream.fetch_many,
+                         path=str(tmp_path / "facts.db"))
+    yield cache
+    cache.disk.close()
+
+
+def stored_keys(cache):
+    rows = cache.disk.connect().execute("SELECT number FROM facts").fetchall()
+    return sorted(set(cache.memory) | {row[0] for row in rows})
+
+
+def test_too_large_is_not_cached(cache, upstream):
+    for _ in range(2):
+        with pytest.raises(numbers_api.NumbersAPIError):
+            cache.get(HUGE)
+    assert upstream.asked == []
+    assert stored_keys(cache) == []
+
+
+def test_too_large_in_a_batch_is_not_cached(cache, upstream):
+    facts, errors = cache.get_many([HUGE, 6, 28])
+    assert facts == {6: "6 is a number.", 28: "28 is a number."}
+    assert errors == {HUGE: numbers_api.TOO_LARGE}
+    assert upstream.asked == [6, 28]
+    assert stored_keys(cache) == ["28", "6"]
+
+
+def test_too_large_alone_in_a_batch_is_not_cached(cache, upstream):
+    facts, errors = cache.get_many([HUGE])
+    assert errors == {HUGE: numbers_api.TOO_LARGE}
+    assert stored_keys(cache) == []
+
+
+def test_upstream_failure_is_cached(cache, upstream):
+    upstream.fail = True
+    with pytest.raises(numbers_api.NumbersAPIError):
+        cache.get(7)
+    with pytest.raises(numbers_api.NumbersAPIError):
+        cache.get(7)
+    assert upstream.asked == [7]
+    assert stored_keys(cache) == ["7"]
+
+
+def test_async_misses_share_one_call(upstream):
+    cache = FunFactCache(async_fetch=upstream.async_fetch, path="")
+
+    async def burst():
+        return await asyncio.gather(*(cache.get_async(12) for _ in range(10)))
+
+    assert asyncio.run(burst()) == ["12 is a number."] * 10
+    assert upstream.asked == [12]
+
+
+def test_async_too_large_is_not_cached(upstream):
+    cache = FunFactCache(async_fetch=upstream.async_fetch, path="")
+    with pytest.raises(numbers_api.NumbersAPIError):
+        asyncio.run(cache.get_async(HUGE))
+    assert cache.memory == {}
+
+
+def test_async_failed_refresh_backs_off(upstream):
+    # Every fact is stale at once, so each lookup wants a refresh
+    cache = FunFactCache(async_fetch=upstream.async_fetch, path="", ttl=0)
+    asyncio.run(cache.get_async(15))
+    upstream.fail = True
+
+    async def lookups():
+        for _ in range(3):
+            assert await cache.get_async(15) == "15 is a number."
+            # Let the refresh task run to completion
+            await asyncio.sleep(0.05)
+
+    asyncio.run(lookups())
+    assert upstream.asked == [15, 15]
+    assert cache.stats["refreshes"] == 1
@@ -0,0 +1,77 @@
+"""
+Checks that both apps answer a repeated classify-number request
+with 304 Not Modified and an empty body when the client sends
+back the ETag (If-None-Match) or Last-Modified time
+(If-Modified-Since) it was given, against a local stub of the
+Numbers API.
+"""
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), "benchmarks"))
+
+from stub_numbers_api import StubNumbersAPI  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def stub():
+    with StubNumbersAPI() as server:
+        yield server
+
+
+@pytest.fixture(scope="module", params=["flask", "asgi"])
+def client(request, stub):
+    # Point the app's Numbers API client at the stub, and back after
+    if request.param == "flask":
+        import app
+        saved, app.fun_facts.base_url = app.fun_facts.base_url, stub.base_url
+        yield app.app.test_client()
+        app.fun_facts.base_url = saved
+    else:
+        from fastapi.testclient import TestClient
+        from asgi_app import app
+        with TestClient(app) as test_client:
+            # The client is created when the app starts, and closed after
+            app.state.fun_facts.base_url = stub.base_url
+            yield test_client
+
+
+def classify(client, number, **headers):
+    return client.get(f"/api/classify-number?number={number}", headers=headers)
+
+
+def body(response):
+    # Flask's test responses hold the body in data, httpx's in content
+    return response.data if hasattr(response, "data") else response.content
+
+
+def test_first_request_has_validators(client):
+    response = classify(client, 28)
+    assert response.status_code == 200
+    assert response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+
+
+def test_if_none_match_gets_empty_304(client):
+    first = classify(client, 153)
+    response = classify(client, 153, **{"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+    assert body(response) == b""
+    assert response.headers["ETag"] == first.headers["ETag"]
+
+
+def test_if_modified_since_gets_empty_304(client):
+    first = classify(client, 371)
+    response = classify(client, 371,
+                        **{"If-Modified-Since": first.headers["Last-Modified"]})
+    assert response.status_code == 304
+    assert body(response) == b""
+
+
+def test_stale_etag_gets_full_response(client):
+    first = classify(client, 407)
+    response = classify(client, 407, **{"If-None-Match": '"stale"'})
+    assert response.status_code == 200
+    assert body(response) == body(first)
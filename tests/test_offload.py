@@ -0,0 +1,45 @@
+"""
+Checks that a number classified in the worker processes gets
+the same answer as one classified inline, including when one
+of its checks runs out of budget.
+"""
+import pytest
+import budget
+import classifier
+import offload
+
+# is_prime finishes within the budget, is_perfect does not
+PARTIAL = int("7" * 3000)
+BUDGET = 1.0
+
+
+@pytest.fixture(scope="module")
+def pool():
+    patch = pytest.MonkeyPatch()
+    patch.setattr(offload, "CLASSIFY_PROCESSES", 1)
+    offload.start()
+    yield
+    offload.stop()
+    patch.undo()
+
+
+def classify_both(number):
+    with budget.limit(BUDGET):
+        inline = classifier.classify(number)
+    with budget.limit(BUDGET):
+        offloaded = offload.classify(number)
+    return inline, offloaded
+
+
+@pytest.mark.parametrize("number", [2 ** 89 - 1, 10 ** 30 + 1])
+def test_offloaded_matches_inline(pool, number):
+    assert offload.wants(number)
+    inline, offloaded = classify_both(number)
+    assert offloaded == inline
+
+
+def test_partial_result_survives_the_pool(pool):
+    inline, offloaded = classify_both(PARTIAL)
+    assert inline["is_prime"] is False
+    assert inline["timeouts"] == ["is_perfect"]
+    assert offloaded == inline
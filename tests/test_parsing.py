@@ -0,0 +1,35 @@
+"""
+Checks that parse_number applies the same grammar to short
+inputs, parsed with int(), and long ones, parsed by divide and
+conquer.
+"""
+import pytest
+import parsing
+
+LONG = parsing.DIRECT_PARSE_DIGITS + 1
+
+
+@pytest.mark.parametrize("text, number", [
+    ("0", 0), ("28", 28), ("+371", 371), ("-153", -153), (" 42\n", 42),
+    ("007", 7), ("1" * LONG, int("1" * LONG)), ("-" + "9" * LONG, -int("9" * LONG)),
+])
+def test_accepts_decimal_integers(text, number):
+    assert parsing.parse_number(text) == number
+
+
+@pytest.mark.parametrize("text", [
+    "", "+", "1_000", "1" * LONG + "_0", "١٢٣", "1٢",
+    "１" * LONG, "12.0", "1e3", "0x1f", "--1", "+-1", "1 000", "abc",
+])
+def test_rejects_everything_else(text):
+    with pytest.raises(ValueError):
+        parsing.parse_number(text)
+
+
+@pytest.mark.parametrize("sign", ["", "+", "-"])
+def test_digit_limit(sign):
+    most = "1" * parsing.MAX_NUMBER_DIGITS
+    # The repunit with MAX_NUMBER_DIGITS ones, without int()'s digit limit
+    assert abs(parsing.parse_number(sign + most)) == (10 ** parsing.MAX_NUMBER_DIGITS - 1) // 9
+    with pytest.raises(parsing.NumberTooLarge):
+        parsing.parse_number(sign + most + "1")
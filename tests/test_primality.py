@@ -0,0 +1,82 @@
+"""
+Checks primality.is_prime against the sieve of Eratosthenes for
+every n below 10^7, runs the Baillie-PSW test on its own over a
+smaller range (is_prime only reaches it above 2^64), and checks
+known pseudoprimes and Carmichael numbers.
+"""
+import pytest
+import primality
+
+# Every n below this is checked against the sieve
+DIFFERENTIAL_LIMIT = 10 ** 7
+
+# The Baillie-PSW test alone is checked on odd n below this
+BPSW_LIMIT = 10 ** 6
+
+# Strong pseudoprimes to base 2, the last ones to every prime base up to 37 or 41
+STRONG_PSEUDOPRIMES = [
+    2047, 3277, 4033, 4681, 8321, 15841, 29341, 42799, 49141, 52633,
+    3215031751, 2152302898747, 3474749660383, 341550071728321,
+    3825123056546413051, 318665857834031151167461,
+    3317044064679887385961981,
+]
+
+# Strong Lucas pseudoprimes with Selfridge's parameters
+LUCAS_PSEUDOPRIMES = [5459, 5777, 10877, 16109, 18971, 22499, 24569, 25199,
+                      40309, 58519]
+
+CARMICHAEL_NUMBERS = [
+    561, 1105, 1729, 2465, 2821, 6601, 8911, 10585, 15841, 29341, 41041,
+    825265, 321197185, 5394826801, 232250619601, 9746347772161,
+    # (6k + 1)(12k + 1)(18k + 1) with k = 1000051, above 2^64
+    1296198694153288947529,
+]
+
+PRIMES_ABOVE_2_64 = [2 ** 89 - 1, 2 ** 107 - 1, 2 ** 127 - 1, 2 ** 521 - 1,
+                     10 ** 30 + 57, 10 ** 50 + 151]
+
+
+def is_bpsw_prime(n):
+    return (primality.is_strong_probable_prime(n, 2)
+            and primality.is_strong_lucas_probable_prime(n))
+
+
+def test_matches_sieve_below_limit():
+    primes = set(primality.small_primes(DIFFERENTIAL_LIMIT))
+    wrong = [n for n in range(-10, DIFFERENTIAL_LIMIT)
+             if primality.is_prime(n) != (n in primes)]
+    assert wrong == []
+
+
+def test_bpsw_matches_sieve():
+    primes = set(primality.small_primes(BPSW_LIMIT))
+    wrong = [n for n in range(primality.SIEVE_LIMIT + 1, BPSW_LIMIT, 2)
+             if is_bpsw_prime(n) != (n in primes)]
+    assert wrong == []
+
+
+@pytest.mark.parametrize("n", STRONG_PSEUDOPRIMES)
+def test_strong_pseudoprimes_are_composite(n):
+    assert primality.is_strong_probable_prime(n, 2)
+    assert not primality.is_prime(n)
+    assert not is_bpsw_prime(n)
+
+
+@pytest.mark.parametrize("n", LUCAS_PSEUDOPRIMES)
+def test_lucas_pseudoprimes_are_composite(n):
+    assert primality.is_strong_lucas_probable_prime(n)
+    assert not primality.is_prime(n)
+    assert not is_bpsw_prime(n)
+
+
+@pytest.mark.parametrize("n", CARMICHAEL_NUMBERS)
+def test_carmichael_numbers_are_composite(n):
+    assert pow(2, n - 1, n) == 1
+    assert not primality.is_prime(n)
+
+
+@pytest.mark.parametrize("p", PRIMES_ABOVE_2_64)
+def test_large_primes(p):
+    assert primality.is_prime(p)
+    # Products of two large primes must fail too
+    assert not primality.is_prime(p * (2 ** 61 - 1))
@@ -0,0 +1,69 @@
+"""
+Checks every query of the wheel-30 prime index against the sieve
+of Eratosthenes, on an index many superblocks long that is built
+in many small chunks, and past its end, where the searches fall
+back to the primality test.
+"""
+from bisect import bisect_left, bisect_right
+import pytest
+import primality
+import prime_index
+
+# Twenty superblocks, and a few numbers past the last
+LIMIT = 30 * prime_index.SUPERBLOCK * 20 + 30 * 5
+
+
+@pytest.fixture(scope="module")
+def index():
+    patch = pytest.MonkeyPatch()
+    # Build in chunks of 7 blocks, so the chunks are joined many times
+    patch.setattr(prime_index, "BUILD_BLOCKS", 7)
+    yield prime_index.build(LIMIT)
+    patch.undo()
+
+
+@pytest.fixture(scope="module")
+def primes(index):
+    # Past the end too, for the searches beyond the index
+    return primality.small_primes(index.limit + 1000)
+
+
+def test_membership(index, primes):
+    indexed = [n for n in range(index.limit) if index.is_prime(n)]
+    assert indexed == primes[:bisect_left(primes, index.limit)]
+
+
+def test_count(index, primes):
+    wrong = [n for n in range(index.limit)
+             if index.count(n) != bisect_right(primes, n)]
+    assert wrong == []
+
+
+def test_select(index, primes):
+    below = primes[:bisect_left(primes, index.limit)]
+    assert index.total == len(below)
+    assert [index.select(k) for k in range(1, index.total + 1)] == below
+    assert index.select(0) is None
+    assert index.select(index.total + 1) is None
+
+
+def test_next_and_previous_prime(index, primes):
+    wrong = []
+    for n in range(-5, index.limit + 500):
+        following = primes[bisect_right(primes, n)]
+        before = bisect_left(primes, n)
+        previous = primes[before - 1] if before else None
+        if prime_index.next_prime(index, n) != following:
+            wrong.append(("next", n))
+        if prime_index.previous_prime(index, n) != previous:
+            wrong.append(("previous", n))
+    assert wrong == []
+
+
+def test_save_and_load(index, tmp_path):
+    path = str(tmp_path / "primes.bin")
+    prime_index.save(index, path)
+    loaded = prime_index.load(path)
+    assert loaded.limit == index.limit
+    assert bytes(loaded.bits) == bytes(index.bits)
+    assert loaded.total == index.total
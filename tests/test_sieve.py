@@ -0,0 +1,53 @@
+"""
+Checks the segmented range sieves against the sieve of
+Eratosthenes, a direct divisor sum and the live property checks,
+with segments small enough that the range crosses many segment
+boundaries.
+"""
+import pytest
+import classifier
+import primality
+import sieve
+
+LIMIT = 5000
+
+# Deliberately not a divisor of anything interesting
+SEGMENT = 97
+
+
+def segments(lo, hi):
+    return [(start, min(start + SEGMENT, hi)) for start in range(lo, hi, SEGMENT)]
+
+
+def sigma(n):
+    return sum(d for d in range(1, n + 1) if n % d == 0)
+
+
+def test_prime_flags_match_small_primes():
+    primes = sieve.base_primes(LIMIT)
+    flags = []
+    for lo, hi in segments(0, LIMIT):
+        flags.extend(sieve.prime_flags(lo, hi, primes).tolist())
+    assert [n for n, prime in enumerate(flags) if prime] == primality.small_primes(LIMIT)
+
+
+def test_divisor_sums_match_direct_sums():
+    primes = sieve.base_primes(LIMIT)
+    sums = []
+    for lo, hi in segments(1, LIMIT):
+        sums.extend(sieve.divisor_sums(lo, hi, primes).tolist())
+    assert sums == [sigma(n) for n in range(1, LIMIT)]
+
+
+def test_classify_range_matches_classify(monkeypatch):
+    # Without the table, which is itself built from the sieves
+    monkeypatch.setattr(classifier, "table", None)
+    results = [data for chunk in sieve.classify_range(-300, LIMIT, SEGMENT)
+               for data in chunk]
+    assert [data["number"] for data in results] == list(range(-300, LIMIT + 1))
+    assert results == [classifier.classify(n) for n in range(-300, LIMIT + 1)]
+
+
+def test_classify_range_rejects_out_of_bounds():
+    with pytest.raises(ValueError):
+        next(sieve.classify_range(0, sieve.SIEVE_MAX + 1))